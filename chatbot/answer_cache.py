@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """LRU + TTL cache of answers keyed by the meaning of the question.
+
+    Standalone questions are embedded and compared by cosine similarity
+    against the cached ones; a neighbour at or above ``threshold`` is a hit.
+    Entries are tagged with the collection version they were answered from
+    and the whole cache is dropped when that version changes.
+    """
+
+    def __init__(self, embeddings, threshold=0.95, ttl=3600, max_entries=1000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._entries = OrderedDict()  # slot -> (question, answer, expires_at), oldest first
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+
+    def _embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _evict(self, slot):
+        del self._entries[slot]
+        self._matrix[slot] = 0.0
+        self._free_slots.append(slot)
+
+    def ensure_version(self, version):
+        """Drop every entry if the underlying collection was re-ingested."""
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        if self._matrix is not None:
+            self._matrix[:] = 0.0
+
+    def lookup(self, question):
+        vector = self._embed(question)
+        with self._lock:
+            if not self._entries:
+                self.misses += 1
+                return None
+            now = time.monotonic()
+            for slot in [slot for slot, entry in self._entries.items() if entry[2] <= now]:
+                self._evict(slot)
+
+            # Free slots are zero rows, so they can never clear the threshold
+            scores = self._matrix @ vector
+            slot = int(np.argmax(scores))
+            if slot not in self._entries or scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return self._entries[slot][1]
+
+    def store(self, question, answer):
+        vector = self._embed(question)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+            if not self._free_slots:
+                self._evict(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            self._matrix[slot] = vector
+            self._entries[slot] = (question, answer, time.monotonic() + self.ttl)
@@ -0,0 +1,150 @@
+import argparse
+import json
+import uuid
+from contextlib import asynccontextmanager
+
+import anyio
+import anyio.to_thread
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from service import RAGService
+
+# Chain runs (retrieval and LLM streaming) in flight at once; each holds a
+# worker thread from its own limiter, so the other endpoints never queue
+# behind answers
+MAX_CONCURRENT_REQUESTS = 64
+
+
+async def iterate_in_limiter(iterator, limiter):
+    """Advance a blocking iterator on worker threads borrowed from ``limiter``."""
+    done = object()
+    while True:
+        item = await anyio.to_thread.run_sync(next, iterator, done, limiter=limiter)
+        if item is done:
+            return
+        yield item
+
+
+async def list_bots(request):
+    service = request.app.state.service
+    return JSONResponse({
+        bot_id: {key: config[key] for key in ("title", "greeting", "placeholder")}
+        for bot_id, config in service.bot_configs.items()
+    })
+
+
+async def bot_stats(request):
+    service = request.app.state.service
+    bot_id = request.path_params["bot_id"]
+    if bot_id not in service.bot_configs:
+        return JSONResponse({"error": f"Unknown bot id: {bot_id}"}, status_code=404)
+    bot = await run_in_threadpool(service.get_bot, bot_id)
+    return JSONResponse({
+        "answer_cache": {"hits": bot.answer_cache.hits, "misses": bot.answer_cache.misses},
+        "rewrites": bot.rewrite_gate.stats(),
+        **service.cache_stats(),
+        "coalescing": bot.single_flight.stats(),
+        "packing": bot.context_packer.stats(),
+        "latency": bot.tracer.metrics(),
+        "sync": bot.sync_stats,
+    })
+
+
+async def session_messages(request):
+    """Return the recent turns of a session, e.g. to redraw a conversation after a restart."""
+    service = request.app.state.service
+    bot_id = request.path_params["bot_id"]
+    if bot_id not in service.bot_configs:
+        return JSONResponse({"error": f"Unknown bot id: {bot_id}"}, status_code=404)
+    history = await run_in_threadpool(
+        service.get_session_history, f"{bot_id}:{request.path_params['session_id']}"
+    )
+    return JSONResponse({"messages": [
+        {"role": "user" if m.type == "human" else "assistant", "content": m.content}
+        for m in history.messages if m.type in ("human", "ai")
+    ]})
+
+
+async def chat(request):
+    """Answer one question in a session, streamed as JSON lines unless ``stream`` is false.
+
+    The request body is ``{"question": ..., "session_id": ..., "stream": true}``;
+    a new session id is issued when none is given. A stream yields
+    ``{"answer": token}`` lines and ends with
+    ``{"session_id": ..., "timings": {...}}`` (or ``{"error": ...}``).
+    """
+    service = request.app.state.service
+    bot_id = request.path_params["bot_id"]
+    if bot_id not in service.bot_configs:
+        return JSONResponse({"error": f"Unknown bot id: {bot_id}"}, status_code=404)
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+    question = str(body.get("question") or "").strip()
+    if not question:
+        return JSONResponse({"error": "question is required"}, status_code=400)
+    session_id = str(body.get("session_id") or uuid.uuid4().hex)
+
+    # Histories are scoped per bot so one session id can talk to several bots
+    timings = {}
+    limiter = request.app.state.chat_limiter
+    tokens = await anyio.to_thread.run_sync(
+        service.stream, bot_id, question, f"{bot_id}:{session_id}", timings, limiter=limiter
+    )
+
+    if not body.get("stream", True):
+        answer = "".join([token async for token in iterate_in_limiter(tokens, limiter)])
+        return JSONResponse({"answer": answer, "session_id": session_id, "timings": timings})
+
+    async def lines():
+        try:
+            async for token in iterate_in_limiter(tokens, limiter):
+                yield json.dumps({"answer": token}) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e), "session_id": session_id}) + "\n"
+            return
+        yield json.dumps({"session_id": session_id, "timings": timings}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def create_app(service=None, max_concurrent_requests=MAX_CONCURRENT_REQUESTS):
+    """Build the API app; the service is created and every bot synced at startup."""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.chat_limiter = anyio.CapacityLimiter(max_concurrent_requests)
+        app.state.service = service or await run_in_threadpool(RAGService)
+        await run_in_threadpool(app.state.service.warm_up)
+        yield
+
+    return Starlette(
+        routes=[
+            Route("/bots", list_bots),
+            Route("/bots/{bot_id}/stats", bot_stats),
+            Route("/bots/{bot_id}/sessions/{session_id}", session_messages),
+            Route("/bots/{bot_id}/chat", chat, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+# ``uvicorn api:app`` serves the default bots
+app = create_app()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the chatbots over an HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrent", type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="chain runs in flight at once")
+    args = parser.parse_args()
+    uvicorn.run(create_app(max_concurrent_requests=args.max_concurrent), host=args.host, port=args.port)
@@ -0,0 +1,64 @@
+import json
+import time
+
+import requests
+
+DEFAULT_API_URL = "http://127.0.0.1:8000"
+
+
+class RAGClient:
+    """Client for the chatbot API served by api.py.
+
+    Connections are pooled in one ``requests.Session``. ``stream`` yields
+    answer tokens as the server produces them.
+    """
+
+    def __init__(self, base_url=DEFAULT_API_URL, timeout=(3.05, 120)):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _get(self, path):
+        response = self.session.get(self.base_url + path, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def bots(self):
+        return self._get("/bots")
+
+    def stats(self, bot_id):
+        return self._get(f"/bots/{bot_id}/stats")
+
+    def messages(self, bot_id, session_id):
+        return self._get(f"/bots/{bot_id}/sessions/{session_id}")["messages"]
+
+    def stream(self, bot_id, question, session_id, timings):
+        """Yield answer tokens and record client-side latency in ``timings``.
+
+        ``timings["first_token"]`` and ``timings["total"]`` are measured as in
+        rag.stream_answer, so they include the network round trip.
+        """
+        started = time.perf_counter()
+        with self.session.post(
+            f"{self.base_url}/bots/{bot_id}/chat",
+            json={"question": question, "session_id": session_id},
+            stream=True,
+            timeout=self.timeout,
+        ) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            # chunk_size=None hands over each token as soon as it arrives
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "error" in event:
+                    raise RuntimeError(event["error"])
+                token = event.get("answer")
+                if token:
+                    timings.setdefault("first_token", time.perf_counter() - started)
+                    yield token
+        timings["total"] = time.perf_counter() - started
+
+    def close(self):
+        self.session.close()
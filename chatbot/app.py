@@ -0,0 +1,17 @@
+import streamlit as st
+
+from chat_ui import get_client, render_chat
+
+# Single entry point for every bot hosted by the API: choose one with ?bot=<id> or from the sidebar
+bots = get_client().bots()
+bot_ids = list(bots)
+requested = st.query_params.get("bot", bot_ids[0])
+bot_id = st.sidebar.selectbox(
+    "Assistant",
+    bot_ids,
+    index=bot_ids.index(requested) if requested in bot_ids else 0,
+    format_func=lambda b: bots[b]["title"],
+)
+st.query_params["bot"] = bot_id
+
+render_chat(bot_id)
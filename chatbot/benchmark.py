@@ -0,0 +1,341 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from bots import BOT_CONFIGS
+from ingestion import collection_version, sync_chroma_db
+from retrievers import BM25Index, HybridRetriever
+from service import Bot, RAGService
+from tracing import Tracer
+from vector_index import CODE_DTYPES, MmapVectorStore, QuantizedVectorStore, normalize, stored_vectors
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Bots under test, with the same PDFs and stores the Streamlit scripts use
+BOTS = {
+    "hr": {"pdf": "HR+Hand+book.pdf", "store": "./chroma_db"},
+    "nu": {"pdf": "tables.pdf", "store": "./NUchroma_db"},
+}
+
+QUESTIONS = {
+    "hr": [
+        "How many casual leaves do employees get in a year?",
+        "What is the notice period for resignation?",
+        "What are the office working hours?",
+        "Is there a policy on work from home?",
+        "How is maternity leave handled?",
+        "What is the dress code?",
+        "How are public holidays decided?",
+        "What happens if I am absent without informing my manager?",
+    ],
+    "nu": [
+        "What is the accommodation allowance for a Sr. Executive travelling to Mumbai?",
+        "What is the daily allowance for Managers in Pune?",
+        "Which mode of travel is allowed for Trainees?",
+        "What are the working hours at NU Hospitals?",
+        "How many days of earned leave are allowed?",
+        "What is the employee referral policy?",
+        "What is the local conveyance rate for a two wheeler?",
+        "Who approves air travel?",
+    ],
+}
+
+RETRIEVAL_KS = (2, 4, 8, 16)
+
+RECALL_KS = (4, 10)
+
+MMR_LAMBDAS = (0.3, 0.5, 0.7)
+
+# Chunk size each chunker is run with, as configured in service.py
+CHUNK_SIZES = {"recursive": 1000, "layout": 1500}
+
+class StubChatModel(BaseChatModel):
+    """Deterministic local stand-in for ChatGroq.
+
+    QA prompts are answered with the first ``answer_words`` words of the
+    context; anything else (the rewrite prompt) echoes the user's question.
+    ``token_latency`` seconds are slept per streamed word to mimic
+    generation time.
+    """
+
+    answer_words: int = 40
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "stub"
+
+    def _reply(self, messages):
+        system = next((m.content for m in messages if m.type == "system"), "")
+        if "Context:" in system:
+            return " ".join(system.split("Context:", 1)[1].split()[:self.answer_words])
+        return next((m.content for m in reversed(messages) if m.type == "human"), "")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for word in self._reply(messages).split(" "):
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+def summarize(seconds):
+    values = np.asarray(seconds) * 1000
+    return {
+        "n": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+    }
+
+
+def timed(fn, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def max_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(rss / (1024 * 1024) if platform.system() == "Darwin" else rss / 1024, 1)
+
+
+def benchmark_ingestion(bot, embeddings, chunker):
+    with tempfile.TemporaryDirectory() as directory:
+        _, stats = sync_chroma_db(bot["pdf"], directory, embeddings, chunk_size=CHUNK_SIZES[chunker], chunker=chunker)
+    return stats
+
+
+def benchmark_retrieval(vectordb, bm25, questions, repeat):
+    results = {}
+    for k in RETRIEVAL_KS:
+        dense, hybrid = [], []
+        retriever = HybridRetriever(vectordb=vectordb, bm25=bm25, k=k, fetch_k=max(20, k))
+        for question in questions:
+            dense += timed(lambda: vectordb.similarity_search(question, k=k), repeat)
+            hybrid += timed(lambda: retriever.invoke(question), repeat)
+        results[f"k={k}"] = {"dense": summarize(dense), "hybrid": summarize(hybrid)}
+    results["bm25_only"] = summarize(
+        [d for question in questions for d in timed(lambda: bm25.search(question, 20), repeat)]
+    )
+    return results
+
+
+def benchmark_mmr(vectordb, bm25, questions, repeat):
+    """Latency MMR adds to hybrid retrieval, and how much it lowers redundancy among the results.
+
+    ``redundancy`` is the mean pairwise cosine similarity of the returned
+    chunks' stored embeddings.
+    """
+    def redundancy(docs):
+        vectors = stored_vectors(vectordb, [doc.id for doc in docs])
+        similarity = vectors @ vectors.T
+        return float(similarity[np.triu_indices(len(docs), 1)].mean()) if len(docs) > 1 else 0.0
+
+    results = {}
+    for mmr_lambda in (None, *MMR_LAMBDAS):
+        retriever = HybridRetriever(vectordb=vectordb, bm25=bm25, mmr_lambda=mmr_lambda)
+        durations = []
+        for question in questions:
+            durations += timed(lambda: retriever.invoke(question), repeat)
+        results["hybrid" if mmr_lambda is None else f"mmr_lambda={mmr_lambda}"] = {
+            "latency": summarize(durations),
+            "redundancy": round(float(np.mean([redundancy(retriever.invoke(q)) for q in questions])), 4),
+        }
+    return results
+
+
+def directory_bytes(directory, suffix):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(directory) for name in names if name.endswith(suffix)
+    )
+
+
+def benchmark_vector_storage(vectordb, store, embeddings, questions, repeat, scale):
+    """Recall, latency and memory of Chroma, the mmap'd exact store and the compact stores.
+
+    Recall is measured against exact float32 search. The collection is
+    padded to ``scale`` vectors with noisy copies of its own embeddings
+    (Chroma is only measured on the real collection), so latency and
+    memory can be compared at larger corpus sizes.
+    """
+    data = vectordb.get(include=["embeddings", "documents", "metadatas"])
+    vectors = normalize(np.asarray(data["embeddings"], dtype=np.float32))
+    ids = list(data["ids"])
+    if scale > len(vectors):
+        rng = np.random.default_rng(0)
+        extra = vectors[rng.integers(0, len(vectors), scale - len(vectors))]
+        extra = normalize(extra + rng.normal(0, 0.05, extra.shape).astype(np.float32))
+        vectors = np.vstack([vectors, extra])
+        ids += [f"synthetic-{i}" for i in range(len(extra))]
+    queries = normalize(np.asarray(embeddings.embed_documents(questions), dtype=np.float32))
+    exact_scores = queries @ vectors.T
+
+    def recall(results, k):
+        hits = [
+            len(set(found[:k]) & set(np.argsort(-exact_scores[i], kind="stable")[:k].tolist())) / min(k, len(ids))
+            for i, found in enumerate(results)
+        ]
+        return round(float(np.mean(hits)), 4)
+
+    results = {"vectors": len(ids), "dim": int(vectors.shape[1])}
+    exact_durations = [d for q in queries for d in timed(lambda: np.argsort(-(vectors @ q))[:max(RECALL_KS)], repeat)]
+    results["exact_float32"] = {"latency": summarize(exact_durations), "memory_bytes": int(vectors.nbytes)}
+
+    if len(ids) == len(data["ids"]):
+        position = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        found = [
+            [position[doc.id] for doc in vectordb.similarity_search_by_vector(q.tolist(), k=max(RECALL_KS))]
+            for q in queries
+        ]
+        durations = [
+            d for q in queries
+            for d in timed(lambda: vectordb.similarity_search_by_vector(q.tolist(), k=max(RECALL_KS)), repeat)
+        ]
+        results["chroma"] = {
+            **{f"recall@{k}": recall(found, k) for k in RECALL_KS},
+            "latency": summarize(durations),
+            # float32 vectors plus the HNSW graph, as held in memory once the index is loaded
+            "memory_bytes": int(vectors.nbytes) + directory_bytes(store, ".bin"),
+        }
+
+    with tempfile.TemporaryDirectory() as directory:
+        MmapVectorStore.build(directory, ids, [""] * len(ids), [{}] * len(ids), vectors)
+        open_durations = timed(lambda: MmapVectorStore(directory, embeddings), repeat)
+        exact = MmapVectorStore(directory, embeddings)
+        found = [[p for p, _ in exact.search_by_vector(q, max(RECALL_KS))] for q in queries]
+        durations = [d for q in queries for d in timed(lambda: exact.search_by_vector(q, max(RECALL_KS)), repeat)]
+        results["exact_mmap"] = {
+            **{f"recall@{k}": recall(found, k) for k in RECALL_KS},
+            "latency": summarize(durations),
+            "open": summarize(open_durations),
+            "memory_bytes": exact.nbytes(),
+        }
+        del exact
+
+    with tempfile.TemporaryDirectory() as directory:
+        for dtype in CODE_DTYPES:
+            QuantizedVectorStore.build(directory, ids, [""] * len(ids), [{}] * len(ids), vectors, dtype=dtype)
+            for rescore in (1, 4):
+                compact = QuantizedVectorStore(directory, embeddings, rescore=rescore)
+                found = [[p for p, _ in compact.search_by_vector(q, max(RECALL_KS))] for q in queries]
+                durations = [d for q in queries for d in timed(lambda: compact.search_by_vector(q, max(RECALL_KS)), repeat)]
+                results[f"{dtype}_rescore{rescore}"] = {
+                    **{f"recall@{k}": recall(found, k) for k in RECALL_KS},
+                    "latency": summarize(durations),
+                    "memory_bytes": compact.nbytes(),
+                }
+            del compact
+    return results
+
+
+def benchmark_chain(name, store, embeddings, questions, repeat, token_latency):
+    """End-to-end latency of the bot's chain, built by service.Bot as in production, with the stub LLM.
+
+    The chain includes the rewrite gate and cache, resolver, answer cache,
+    coalescing, MMR and context packing. The first run of a question is
+    reported apart from its repeats, which the answer cache serves.
+    """
+    service = RAGService(
+        {name: {**BOT_CONFIGS[name], "chroma_db_path": store}},
+        llm=StubChatModel(token_latency=token_latency), embeddings=embeddings,
+        session_history=lambda session_id: InMemoryChatMessageHistory(),
+    )
+    bot = Bot(name, service.bot_configs[name], service)
+    # Keep the benchmark out of the bot's metrics files
+    bot.tracer = Tracer()
+    bot.refresh()
+    first, repeats = [], []
+    for question in questions:
+        durations = timed(lambda: bot.chain.invoke({"input": question, "chat_history": []}), repeat)
+        first.append(durations[0])
+        repeats += durations[1:]
+    return {"first": summarize(first), "repeat": summarize(repeats) if repeats else None}
+
+
+def run(bot_names, repeat, token_latency, chunker, vector_scale):
+    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    results = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "embedding_model": EMBEDDING_MODEL,
+        "repeat": repeat,
+        "token_latency": token_latency,
+        "chunker": chunker,
+        "bots": {},
+    }
+    for name in bot_names:
+        bot = BOTS[name]
+        questions = QUESTIONS[name]
+        ingestion = benchmark_ingestion(bot, embeddings, chunker)
+        # Sync and index a copy, so the benchmark never rewrites the bots' live stores
+        with tempfile.TemporaryDirectory() as directory:
+            store = os.path.join(directory, os.path.basename(os.path.normpath(bot["store"])))
+            if os.path.isdir(bot["store"]):
+                shutil.copytree(bot["store"], store)
+            vectordb, _ = sync_chroma_db(
+                bot["pdf"], store, embeddings, chunk_size=CHUNK_SIZES[chunker], chunker=chunker
+            )
+            bm25 = BM25Index.load(store)
+            bot_results = results["bots"][name] = {
+                "ingestion": ingestion,
+                "retrieval": benchmark_retrieval(vectordb, bm25, questions, repeat),
+                "mmr": {
+                    "chroma": benchmark_mmr(vectordb, bm25, questions, repeat),
+                    "exact_mmap": benchmark_mmr(
+                        MmapVectorStore.from_vectordb(vectordb, embeddings, store, version=collection_version(store)),
+                        bm25, questions, repeat,
+                    ),
+                },
+                "vector_storage": benchmark_vector_storage(
+                    vectordb, store, embeddings, questions, repeat, vector_scale
+                ),
+            }
+            # Last, as the bot re-syncs the copy when --chunker differs from the service's
+            bot_results["chain"] = benchmark_chain(name, store, embeddings, questions, repeat, token_latency)
+            bot_results["max_rss_mb"] = max_rss_mb()
+    results["max_rss_mb"] = max_rss_mb()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of the chatbot RAG pipeline with a stub LLM.")
+    parser.add_argument("--bots", nargs="+", choices=sorted(BOTS), default=sorted(BOTS))
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per question")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds the stub LLM sleeps per token")
+    parser.add_argument("--chunker", choices=sorted(CHUNK_SIZES), default="layout")
+    parser.add_argument("--vector-scale", type=int, default=0,
+                        help="pad the collection to this many vectors for the vector storage benchmark")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = run(args.bots, args.repeat, args.token_latency, args.chunker, args.vector_scale)
+    output = args.output or os.path.join("benchmarks", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
@@ -0,0 +1,87 @@
+import os
+import uuid
+
+import streamlit as st
+
+from api_client import DEFAULT_API_URL, RAGClient
+
+# The chat API (api.py) hosts the bots; this UI only renders the conversation
+API_URL = os.getenv("RAG_API_URL", DEFAULT_API_URL)
+
+
+# One pooled client per server process, shared by all sessions
+@st.cache_resource
+def get_client():
+    return RAGClient(API_URL)
+
+
+def render_sidebar(stats):
+    # Cache, rewrite and latency counters of this bot in the API server
+    rewrite_stats = stats["rewrites"]
+    st.sidebar.caption(f"Answer cache: {stats['answer_cache']['hits']} hits, {stats['answer_cache']['misses']} misses")
+    st.sidebar.caption(
+        f"Query rewrites: {rewrite_stats['rewritten']} run, "
+        f"{rewrite_stats['skipped_no_history'] + rewrite_stats['skipped_self_contained']} skipped "
+        f"({rewrite_stats['skip_rate']:.0%})"
+    )
+    memo = [
+        f"{name} {stats[key]['hit_rate']:.0%} hits"
+        for name, key in (("query embeddings", "query_embeddings"), ("rewrites", "rewrite_cache"))
+        if stats.get(key)
+    ]
+    if memo:
+        st.sidebar.caption("Query caches: " + ", ".join(memo))
+    coalescing = stats["coalescing"]
+    st.sidebar.caption(f"Coalesced: {coalescing['followers']} questions shared an in-flight answer")
+    packing = stats["packing"]
+    st.sidebar.caption(
+        f"Context packing: {packing['chunks_in']} chunks -> {packing['chunks_out']} passages "
+        f"({packing['token_savings']:.0%} fewer tokens)"
+    )
+    latency = stats["latency"]["stages"].get("total")
+    if latency:
+        st.sidebar.caption(f"Latency p50 {latency['p50']:.2f}s, p95 {latency['p95']:.2f}s, p99 {latency['p99']:.2f}s")
+
+
+def render_chat(bot_id):
+    client = get_client()
+    config = client.bots()[bot_id]
+    stats = client.stats(bot_id)
+    sync_stats = stats["sync"]
+    if sync_stats["added"] or sync_stats["deleted"]:
+        st.info(
+            f"Embedded {sync_stats['added']} changed chunks, removed {sync_stats['deleted']} stale chunks "
+            f"({sync_stats['pages_per_s']} pages/s, {sync_stats['chunks_per_s']} chunks/s)."
+        )
+
+    # The API keeps the chat history under this id; it is kept in the URL so
+    # a reload or a server restart continues the same conversation
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+
+    messages_key = f"{bot_id}_messages"
+    if messages_key not in st.session_state:
+        st.session_state[messages_key] = [{'role': "assistant", 'content': config["greeting"]}]
+        st.session_state[messages_key] += client.messages(bot_id, st.session_state.session_id)
+    messages = st.session_state[messages_key]
+
+    # Streamlit UI
+    st.markdown(f"<h1 style='text-align: center;'>{config['title']}</h1>", unsafe_allow_html=True)
+    render_sidebar(stats)
+
+    # Display chat history
+    for msg in messages:
+        st.chat_message(msg["role"]).write(msg['content'])
+
+    if prompt := st.chat_input(placeholder=config["placeholder"]):
+        messages.append({"role": "user", "content": prompt})
+        st.chat_message("user").write(prompt)
+
+        # Stream the response from the API as it is generated
+        timings = {}
+        with st.chat_message("assistant"):
+            response_text = st.write_stream(client.stream(bot_id, prompt, st.session_state.session_id, timings))
+            st.caption(f"First token {timings.get('first_token', timings['total']):.2f}s, total {timings['total']:.2f}s")
+
+        messages.append({"role": "assistant", "content": response_text})
@@ -0,0 +1,160 @@
+import re
+
+from langchain_core.documents import Document
+
+# Running page header of the NU Hospitals manual ends with "Page 12 of 63"
+PAGE_NUMBER_PATTERN = re.compile(r"^page \d+ of \d+$", re.IGNORECASE)
+# "III. Leave Policy", "B. Annual / Privilege Leave:", "a. Travel", "10. Holidays"
+OUTLINE_PATTERN = re.compile(r"^(?P<number>[IVX]+|[A-Za-z]|\d{1,2})\.\s+(?P<title>[A-Z\"'(].{0,80})$")
+# "Purpose:", "Grid B:", "Claim Process:"
+LABEL_PATTERN = re.compile(r"^(?P<title>[A-Z][^.:•✓]{0,50}):$")
+# Table-of-contents entries end with their page numbers: "10. Leave policy 20-24"
+TOC_ENTRY_PATTERN = re.compile(r"(\.{3,}|\s)\s*\d+(\s*-\s*\d+)?\.*$")
+BULLET_PATTERN = re.compile(r"^[•✓▪➢\-–*]\s*|^o\s")
+LABEL_LEVEL = 9
+
+
+def in_page_order(docs):
+    """Re-order page Documents that arrive out of order (e.g. from parse_pdf_pages)."""
+    pending = {}
+    expected = 0
+    for doc in docs:
+        pending[doc.metadata["page"]] = doc
+        while expected in pending:
+            yield pending.pop(expected)
+            expected += 1
+    for page in sorted(pending):
+        yield pending[page]
+
+
+class LayoutSplitter:
+    """Splits PDF pages along their headings, paragraphs, list items and table rows.
+
+    The running header of a page (everything down to a "Page N of M" line
+    near the top) is dropped. Outline headings ("III. Leave Policy",
+    "B. Sick Leave") and label lines ("Grid B:") open a new section;
+    the path of open headings is carried from page to page and stored as
+    ``section`` metadata. Sections are packed into chunks of up to
+    ``chunk_size`` characters, several short ones sharing a chunk. Lines
+    are never cut, so table rows stay whole, and a paragraph, list item or
+    table is only split across chunks when it is longer than a chunk on its
+    own. A chunk that starts mid-section is prefixed with its section path
+    so it still reads (and embeds) in context.
+    """
+
+    def __init__(self, chunk_size=1500, header_lines=15):
+        self.chunk_size = chunk_size
+        self.header_lines = header_lines
+
+    def _strip_header(self, lines):
+        for i, line in enumerate(lines[:self.header_lines]):
+            if PAGE_NUMBER_PATTERN.match(line):
+                return lines[i + 1:]
+        return lines
+
+    @staticmethod
+    def _heading(line, path):
+        """Return (level, title) if ``line`` is a heading, else None."""
+        match = OUTLINE_PATTERN.match(line)
+        if match and len(match.group("title")) <= 60 and not TOC_ENTRY_PATTERN.search(match.group("title")):
+            number = match.group("number")
+            last_letter = next((title[0] for level, title in reversed(path) if level == 2), None)
+            if number.isdigit():
+                level = 1
+            elif len(number) > 1 or number in "IVX":
+                # "I", "V" and "X" are letters when they follow "H", "U" and "W"
+                level = 2 if len(number) == 1 and last_letter == chr(ord(number) - 1) else 1
+            else:
+                level = 2 if number.isupper() else 3
+            return level, f"{number}. {match.group('title').rstrip(':. ')}"
+        match = LABEL_PATTERN.match(line)
+        if match:
+            return LABEL_LEVEL, match.group("title").strip()
+        return None
+
+    def _sections(self, lines, path):
+        """Group lines into sections of units; a unit is a paragraph, list item or table.
+
+        Returns a list of (path, units, opens_with_heading) and the path
+        still open after the last line.
+        """
+        sections = [(list(path), [], False)]
+        unit = None
+        # A heading shares a unit with the block after it, so it never ends a chunk alone
+        after_heading = False
+        for line in lines:
+            if not line:
+                if not after_heading:
+                    unit = None
+                continue
+            heading = self._heading(line, path)
+            if heading is not None:
+                path = [entry for entry in path if entry[0] < heading[0]] + [heading]
+                unit = [line]
+                sections.append((list(path), [unit], True))
+                after_heading = True
+                continue
+            if unit is None or (BULLET_PATTERN.match(line) and not after_heading):
+                unit = [line]
+                sections[-1][1].append(unit)
+            else:
+                unit.append(line)
+            after_heading = False
+        return [section for section in sections if section[1]], path
+
+    def _pieces(self, unit):
+        """Split a unit longer than a chunk at line boundaries (and long lines at spaces)."""
+        pieces, current = [], ""
+        for line in unit:
+            while len(line) > self.chunk_size:
+                cut = line.rfind(" ", 0, self.chunk_size)
+                cut = cut if cut > 0 else self.chunk_size
+                pieces.append(line[:cut])
+                line = line[cut:].lstrip()
+            if current and len(current) + 1 + len(line) > self.chunk_size:
+                pieces.append(current)
+                current = ""
+            current = f"{current}\n{line}" if current else line
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def split_page(self, doc, section_path=()):
+        """Split one page; returns (chunks, section path open at the end of the page)."""
+        lines = [re.sub(r"\s+", " ", line).strip() for line in doc.page_content.splitlines()]
+        sections, section_path = self._sections(self._strip_header(lines), list(section_path))
+
+        chunks = []
+        text, chunk_section = "", None
+
+        def flush():
+            if text:
+                chunks.append(Document(
+                    page_content=text,
+                    metadata={**doc.metadata, "section": chunk_section, "chunk_index": len(chunks)},
+                ))
+
+        for path, units, opens_with_heading in sections:
+            section = " > ".join(title for _, title in path)
+            for i, unit in enumerate(units):
+                joined = "\n".join(unit)
+                pieces = self._pieces(unit) if len(joined) > self.chunk_size else [joined]
+                for j, piece in enumerate(pieces):
+                    if text and len(text) + 2 + len(piece) > self.chunk_size:
+                        flush()
+                        text = ""
+                    if not text:
+                        chunk_section = section
+                        # A chunk opening mid-section carries its heading path
+                        if section and not (opens_with_heading and i == 0 and j == 0):
+                            piece = f"[{section}]\n{piece}"
+                    text = f"{text}\n\n{piece}" if text else piece
+        flush()
+        return chunks, [list(entry) for entry in section_path]
+
+    def split_documents(self, docs):
+        chunks, section_path = [], []
+        for doc in in_page_order(docs):
+            page_chunks, section_path = self.split_page(doc, section_path)
+            chunks.extend(page_chunks)
+        return chunks
@@ -0,0 +1,104 @@
+import contextvars
+import hashlib
+import threading
+
+from query_cache import normalize_question
+
+
+class _Call:
+    """Chunks produced so far by one in-flight computation."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """Coalesces identical concurrent streamed computations.
+
+    The first caller with a key starts the computation on a worker thread;
+    it and every caller arriving with the same key while it is in flight
+    replay the chunks produced so far and then follow it live, so N
+    identical questions cost one retrieval and one LLM call. The worker
+    runs to completion whoever disconnects, so one closed client does not
+    fail the others. Keys combine the normalized question, the collection
+    version and a digest of the chat history.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def ensure_version(self, version):
+        self.version = version
+
+    def key(self, question, chat_history=()):
+        history = hashlib.sha256(
+            "\x1e".join(f"{m.type}\x1f{m.content}" for m in chat_history or ()).encode("utf-8")
+        ).hexdigest()
+        return normalize_question(question), self.version, history
+
+    def stream(self, key, produce):
+        """Yield the chunks of ``produce()``, sharing one run among concurrent callers with ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if leader:
+            # The worker inherits the caller's context (e.g. LangChain callbacks)
+            worker = threading.Thread(
+                target=contextvars.copy_context().run, args=(self._run, key, call, produce),
+                name="single-flight", daemon=True,
+            )
+            worker.start()
+        return self._follow(call, leader)
+
+    def _run(self, key, call, produce):
+        try:
+            for chunk in produce():
+                with call.condition:
+                    call.chunks.append(chunk)
+                    call.condition.notify_all()
+        except BaseException as e:
+            call.error = e
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            with call.condition:
+                call.done = True
+                call.condition.notify_all()
+
+    def _follow(self, call, leader=False):
+        seen = 0
+        while True:
+            with call.condition:
+                while seen == len(call.chunks) and not call.done:
+                    call.condition.wait()
+                chunks = call.chunks[seen:]
+                done = call.done
+            seen += len(chunks)
+            yield from chunks
+            if done:
+                if call.error is not None:
+                    if leader:
+                        raise call.error
+                    raise RuntimeError("The coalesced request failed") from call.error
+                return
+
+    def stats(self):
+        with self._lock:
+            total = self.leaders + self.followers
+            return {
+                "leaders": self.leaders,
+                "followers": self.followers,
+                "coalesce_rate": self.followers / total if total else 0.0,
+            }
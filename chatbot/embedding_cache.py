@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from ingestion import sha256_text
+from query_cache import LRUCache, normalize_question
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+DEFAULT_CACHE_DIR = "./embedding_cache"
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper backed by an on-disk, content-addressed cache.
+
+    Vectors are appended to ``vectors.f32`` (one float32 row per text) and
+    read back through a memory map; ``index.json`` maps the sha256 of each
+    text to its row. Every model gets its own directory, so the cache key is
+    effectively (model name, text hash) and all bots can share one cache.
+    Query embeddings are kept in memory instead, in an LRU of
+    ``query_cache_size`` entries keyed on the normalized question, so the
+    answer cache, the retriever and repeated questions share one model call.
+    """
+
+    def __init__(self, embeddings, model_name, cache_dir=DEFAULT_CACHE_DIR, query_cache_size=1024):
+        self.embeddings = embeddings
+        self.query_cache = LRUCache(query_cache_size)
+        self.model_name = model_name
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.lock_path = os.path.join(self.directory, ".lock")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._index = {}
+        self._dim = None
+        self._index_mtime = None
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+        self._reload_index()
+
+    def _reload_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        mtime = os.path.getmtime(self.index_path)
+        if mtime == self._index_mtime:
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._dim = data["dim"]
+        self._index = data["rows"]
+        self._index_mtime = mtime
+        self._matrix = None
+
+    def _rows(self):
+        # Re-mapped lazily after every append or index reload
+        if self._matrix is None:
+            rows = os.path.getsize(self.vectors_path) // (self._dim * 4)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._matrix
+
+    def _append(self, keys, vectors):
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Another process may have appended since we last looked
+                self._reload_index()
+                vectors = np.asarray(vectors, dtype=np.float32)
+                if self._dim is None:
+                    self._dim = vectors.shape[1]
+                start = os.path.getsize(self.vectors_path) // (self._dim * 4) if os.path.exists(self.vectors_path) else 0
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.tobytes())
+                for offset, key in enumerate(keys):
+                    self._index.setdefault(key, start + offset)
+
+                tmp_path = self.index_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self._dim, "rows": self._index}, f)
+                os.replace(tmp_path, self.index_path)
+                self._index_mtime = os.path.getmtime(self.index_path)
+                self._matrix = None
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        keys = [sha256_text(text) for text in texts]
+        with self._lock:
+            if any(key not in self._index for key in keys):
+                self._reload_index()
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._index:
+                    missing.setdefault(key, text)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                vectors = self.embeddings.embed_documents(list(missing.values()))
+                self._append(list(missing.keys()), vectors)
+
+            matrix = self._rows()
+            return [matrix[self._index[key]].tolist() for key in keys]
+
+    def embed_query(self, text):
+        key = normalize_question(text)
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = tuple(self.embeddings.embed_query(text))
+            self.query_cache.put(key, vector)
+        return list(vector)
@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import SystemMessage, message_to_dict, messages_from_dict
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+summary_prompt = ChatPromptTemplate.from_messages([
+    ("system",
+     "You maintain a running summary of a conversation between a user and an assistant. "
+     "Extend the current summary with the new lines. Keep names, numbers, cities, designations and "
+     "policy details the user may refer back to, stay under 150 words and reply with the summary only."),
+    ("human", "Current summary:\n{summary}\n\nNew lines:\n{new_lines}"),
+])
+
+
+def estimate_tokens(text):
+    # Rough count for English text; good enough for budgeting prompt size
+    return len(text) // 4 + 1
+
+
+class SummarizingChatHistory(BaseChatMessageHistory):
+    """Chat history with a token budget.
+
+    The last ``max_turns`` turns are kept verbatim. When they exceed that
+    count or ``max_tokens``, the oldest turns are folded into a rolling
+    summary by ``llm`` (or dropped when no llm is given) until only half of
+    ``max_turns`` remain, so the summary is refreshed every few turns rather
+    than on each one. ``messages`` returns the summary as a system message
+    followed by the verbatim turns.
+    """
+
+    def __init__(self, llm=None, max_turns=6, max_tokens=1500):
+        self.summarizer = summary_prompt | llm | StrOutputParser() if llm is not None else None
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary = ""
+        self.recent = []
+
+    @property
+    def messages(self):
+        if not self.summary:
+            return list(self.recent)
+        return [SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")] + self.recent
+
+    def add_messages(self, messages):
+        self.recent.extend(messages)
+        self._compact()
+
+    def clear(self):
+        self.summary = ""
+        self.recent = []
+
+    def _tokens(self):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(m.content) for m in self.recent)
+
+    def _compact(self):
+        if len(self.recent) <= 2 * self.max_turns and self._tokens() <= self.max_tokens:
+            return
+        keep = max(1, self.max_turns // 2)
+        folded = []
+        while len(self.recent) > 2 and (len(self.recent) > 2 * keep or self._tokens() > self.max_tokens):
+            folded.extend(self.recent[:2])
+            del self.recent[:2]
+        if folded and self.summarizer is not None:
+            new_lines = "\n".join(
+                f"{'User' if m.type == 'human' else 'Assistant'}: {m.content}" for m in folded
+            )
+            self.summary = self.summarizer.invoke({"summary": self.summary or "(none)", "new_lines": new_lines})
+
+
+class PersistentChatHistory(SummarizingChatHistory):
+    """SummarizingChatHistory whose messages and summaries are appended to a ChatHistoryStore.
+
+    Each summary is stored with the id of the last message it covers, so a
+    reload starts from that summary and the messages after it. The store
+    hands one instance to every request of a session, so appends, summaries
+    and reads take turns on a per-history lock.
+    """
+
+    def __init__(self, store, session_id, llm=None, max_turns=6, max_tokens=1500):
+        super().__init__(llm, max_turns=max_turns, max_tokens=max_tokens)
+        self.store = store
+        self.session_id = session_id
+        self.summary, self.recent_ids, self.recent = store.load(session_id, limit=2 * max_turns)
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self):
+        with self._lock:
+            return super().messages
+
+    def add_messages(self, messages):
+        with self._lock:
+            self.recent_ids.extend(self.store.append(self.session_id, messages))
+            super().add_messages(messages)
+            folded = len(self.recent_ids) - len(self.recent)
+            if folded:
+                self.store.append_summary(self.session_id, self.summary, self.recent_ids[folded - 1])
+                del self.recent_ids[:folded]
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self.recent_ids = []
+            self.store.append_summary(self.session_id, "")
+
+
+class ChatHistoryStore:
+    """Per-session chat histories persisted in sharded SQLite files.
+
+    Sessions are spread over ``shards`` database files by a hash of their id,
+    so concurrent sessions rarely wait on the same write lock. Writes only
+    ever insert rows: every message is appended, and so is every new
+    summary. Loading a session reads its latest summary and at most the last
+    ``2 * max_turns`` messages after it. Loaded histories stay in memory
+    until they are idle for ``idle_seconds`` or pushed out by
+    ``max_sessions`` more recent ones.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            message TEXT NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+        CREATE TABLE IF NOT EXISTS summaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            through INTEGER NOT NULL,
+            created REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS summaries_session ON summaries (session_id, id);
+    """
+
+    def __init__(self, directory, llm=None, shards=8, max_turns=6, max_tokens=1500,
+                 idle_seconds=1800, max_sessions=10000):
+        self.directory = directory
+        self.llm = llm
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        os.makedirs(directory, exist_ok=True)
+        self._shards = [self._connect(os.path.join(directory, f"history-{i}.sqlite3")) for i in range(shards)]
+        self._shard_locks = [threading.Lock() for _ in range(shards)]
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _connect(self, path):
+        connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(self.SCHEMA)
+        return connection
+
+    def _shard(self, session_id):
+        i = zlib.crc32(session_id.encode("utf-8")) % len(self._shards)
+        return self._shards[i], self._shard_locks[i]
+
+    def append(self, session_id, messages):
+        """Append messages to a session and return their row ids."""
+        connection, lock = self._shard(session_id)
+        now = time.time()
+        with lock:
+            connection.execute("BEGIN")
+            ids = [
+                connection.execute(
+                    "INSERT INTO messages (session_id, message, created) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(message_to_dict(message)), now),
+                ).lastrowid
+                for message in messages
+            ]
+            connection.execute("COMMIT")
+        return ids
+
+    def append_summary(self, session_id, summary, through=None):
+        """Record a summary covering messages up to row id ``through`` (default: all of them)."""
+        connection, lock = self._shard(session_id)
+        with lock:
+            connection.execute(
+                "INSERT INTO summaries (session_id, summary, through, created) VALUES "
+                "(?, ?, COALESCE(?, (SELECT MAX(id) FROM messages WHERE session_id = ?), 0), ?)",
+                (session_id, summary, through, session_id, time.time()),
+            )
+
+    def load(self, session_id, limit):
+        """Return (summary, message ids, messages) with at most ``limit`` messages."""
+        connection, lock = self._shard(session_id)
+        with lock:
+            row = connection.execute(
+                "SELECT summary, through FROM summaries WHERE session_id = ? ORDER BY id DESC LIMIT 1",
+                (session_id,),
+            ).fetchone()
+            summary, through = row or ("", 0)
+            rows = connection.execute(
+                "SELECT id, message FROM messages WHERE session_id = ? AND id > ? ORDER BY id DESC LIMIT ?",
+                (session_id, through, limit),
+            ).fetchall()
+        rows.reverse()
+        return summary, [id for id, _ in rows], messages_from_dict([json.loads(m) for _, m in rows])
+
+    def get(self, session_id):
+        """Return the history of a session, loading it from disk when it is not in memory."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.pop(session_id, None)
+            history = entry[0] if entry else None
+            if history is None:
+                history = PersistentChatHistory(
+                    self, session_id, self.llm, max_turns=self.max_turns, max_tokens=self.max_tokens
+                )
+            self._sessions[session_id] = (history, now)
+        return history
+
+    def _evict(self, now):
+        # Sessions are kept in order of last use, so idle ones are at the front
+        while self._sessions:
+            _, last_used = next(iter(self._sessions.values()))
+            if len(self._sessions) < self.max_sessions and now - last_used < self.idle_seconds:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def close(self):
+        for connection, lock in zip(self._shards, self._shard_locks):
+            with lock:
+                connection.close()
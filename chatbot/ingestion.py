@@ -0,0 +1,333 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from chunking import LayoutSplitter, in_page_order
+from retrievers import BM25_INDEX_NAME, BM25Index
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Pipeline tuning: PDFs up to INLINE_PARSE_MAX_PAGES pages are parsed in
+# the calling process (a page takes ~30 ms, starting the parser pool ~2 s),
+# pages handed to each parser process per task, chunks per embedding call,
+# and how many batches may wait for the embedder.
+INLINE_PARSE_MAX_PAGES = 100
+PAGES_PER_TASK = 8
+EMBED_BATCH_SIZE = 64
+EMBED_QUEUE_SIZE = 4
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Manifest helpers: the manifest lives next to chroma.sqlite3 and records
+# which chunk ids were produced from which page of the source PDF.
+def manifest_path(persist_directory):
+    return os.path.join(persist_directory, MANIFEST_NAME)
+
+
+def load_manifest(persist_directory):
+    path = manifest_path(persist_directory)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(persist_directory, manifest):
+    os.makedirs(persist_directory, exist_ok=True)
+    path = manifest_path(persist_directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def collection_version(persist_directory, manifest=None):
+    """Identifier that changes whenever the store is re-ingested from a different PDF or splitter."""
+    if manifest is None:
+        manifest = load_manifest(persist_directory)
+    if manifest is None:
+        return None
+    return sha256_text(json.dumps([manifest["pdf_sha256"], manifest["splitter"]], sort_keys=True))[:16]
+
+
+def splitter_settings(chunk_size=1000, chunk_overlap=100, chunker="recursive"):
+    """Splitter settings as recorded in the manifest."""
+    settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+    if chunker != "recursive":
+        settings["chunker"] = chunker
+    return settings
+
+
+def chunk_ids_for_page(chunks):
+    """Content-addressed ids for the chunks of one page.
+
+    The id covers the source, page and text, so an unchanged chunk keeps its
+    id across rebuilds. Repeated identical chunks on a page get a suffix.
+    """
+    ids = []
+    seen = {}
+    for chunk in chunks:
+        key = "{}|{}|{}".format(
+            os.path.basename(str(chunk.metadata.get("source", ""))),
+            chunk.metadata.get("page", ""),
+            chunk.page_content,
+        )
+        digest = sha256_text(key)[:32]
+        count = seen.get(digest, 0)
+        seen[digest] = count + 1
+        ids.append(digest if count == 0 else "{}-{}".format(digest, count))
+    return ids
+
+
+def _extract_pages(pdf_path, page_numbers):
+    # Runs in a worker process: each worker opens its own reader
+    reader = PdfReader(pdf_path)
+    return [(page_number, reader.pages[page_number].extract_text()) for page_number in page_numbers]
+
+
+def parse_pdf_pages(pdf_path, workers=None, pages_per_task=PAGES_PER_TASK, inline_max_pages=INLINE_PARSE_MAX_PAGES):
+    """Yield one Document per PDF page, parsing page ranges in a process pool.
+
+    Pages are yielded as soon as their range is parsed, so they may arrive
+    out of order. PDFs of up to ``inline_max_pages`` pages are parsed
+    inline, where a pool costs more than it saves. The pool spawns fresh
+    interpreters: the caller already runs the embedding writer, model and
+    server threads, which a forked child would inherit mid-operation.
+    """
+    total_pages = len(PdfReader(pdf_path).pages)
+    workers = workers or os.cpu_count() or 1
+    ranges = [
+        list(range(first, min(first + pages_per_task, total_pages)))
+        for first in range(0, total_pages, pages_per_task)
+    ]
+
+    def to_documents(extracted):
+        for page_number, text in extracted:
+            yield Document(
+                page_content=text,
+                metadata={"source": pdf_path, "page": page_number, "total_pages": total_pages},
+            )
+
+    if workers <= 1 or len(ranges) <= 1 or total_pages <= inline_max_pages:
+        for page_numbers in ranges:
+            yield from to_documents(_extract_pages(pdf_path, page_numbers))
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)), mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = [pool.submit(_extract_pages, pdf_path, page_numbers) for page_numbers in ranges]
+        for future in as_completed(futures):
+            yield from to_documents(future.result())
+
+
+class _EmbeddingWriter:
+    """Background thread that embeds and upserts chunk batches.
+
+    Batches go through a bounded queue, so the parser blocks instead of
+    piling up chunks when embedding is the bottleneck.
+    """
+
+    def __init__(self, vectordb, queue_size):
+        self.vectordb = vectordb
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                # Keep draining so the producer never blocks on a dead consumer
+                continue
+            ids, documents = batch
+            try:
+                self.vectordb.add_documents(documents=documents, ids=ids)
+            except Exception as e:
+                self.error = e
+
+    def put(self, ids, documents):
+        self.queue.put((ids, documents))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+def sync_chroma_db(
+    pdf_path,
+    persist_directory,
+    embeddings,
+    chunk_size=1000,
+    chunk_overlap=100,
+    workers=None,
+    batch_size=EMBED_BATCH_SIZE,
+    queue_size=EMBED_QUEUE_SIZE,
+    chunker="recursive",
+    open_store=None,
+):
+    """Bring the Chroma store at ``persist_directory`` in line with ``pdf_path``.
+
+    Pages are parsed in a process pool and split as they arrive; chunks
+    whose content hash is not already stored are embedded in fixed-size
+    batches on a background thread, and chunks that no longer exist in the
+    PDF are deleted. The BM25 index used by HybridRetriever is rebuilt
+    next to the store whenever it changes. ``chunker`` is "recursive"
+    (RecursiveCharacterTextSplitter) or "layout" (chunking.LayoutSplitter,
+    which ignores ``chunk_overlap``). Returns the vector store and a
+    dict of counts and throughput (pages/s, chunks/s of embedded chunks).
+
+    When the store is already up to date, ``open_store(version)`` is tried
+    first; a store it returns (e.g. a vector_index.MmapVectorStore) is used
+    instead of Chroma, so no Chroma client is started. Return None to
+    fall back to Chroma.
+    """
+    started = time.perf_counter()
+    settings = splitter_settings(chunk_size, chunk_overlap, chunker)
+    pdf_hash = file_sha256(pdf_path)
+    manifest = load_manifest(persist_directory)
+    up_to_date = (
+        manifest is not None
+        and manifest["pdf_sha256"] == pdf_hash
+        and manifest["splitter"] == settings
+    )
+
+    if up_to_date and open_store is not None and os.path.exists(os.path.join(persist_directory, BM25_INDEX_NAME)):
+        store = open_store(collection_version(persist_directory))
+        if store is not None:
+            return store, _stats(0, 0, len(store), 0, started)
+
+    vectordb = Chroma(persist_directory=persist_directory, embedding_function=embeddings)
+
+    # A store restored from a snapshot has a manifest, but Chroma may hold
+    # none (or other) chunks; only trust the manifest if Chroma holds exactly its chunks
+    if up_to_date:
+        manifest_ids = {chunk_id for page in manifest["pages"].values() for chunk_id in page["chunks"]}
+        stored_ids = set(vectordb.get(include=[])["ids"])
+        if manifest_ids == stored_ids:
+            if not os.path.exists(os.path.join(persist_directory, BM25_INDEX_NAME)):
+                BM25Index.from_vectordb(vectordb).save(persist_directory)
+            return vectordb, _stats(0, 0, len(manifest_ids), 0, started)
+
+    old_pages = {}
+    if manifest is not None and manifest["splitter"] == settings:
+        old_pages = manifest["pages"]
+
+    if chunker == "layout":
+        # Section paths run across pages, so pages are split in order
+        split_page = LayoutSplitter(chunk_size=chunk_size).split_page
+        page_docs = in_page_order(parse_pdf_pages(pdf_path, workers=workers))
+    elif chunker == "recursive":
+        text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        split_page = lambda doc, section_path: (text_splitter.split_documents([doc]), section_path)
+        page_docs = parse_pdf_pages(pdf_path, workers=workers)
+    else:
+        raise ValueError(f"Unknown chunker: {chunker}")
+
+    # Diff against what the collection actually holds rather than the old
+    # manifest, so stores built before the manifest existed are cleaned up too.
+    stored_ids = set(vectordb.get(include=[])["ids"])
+
+    pages = {}
+    wanted_ids = set()
+    added = 0
+    section_path = []
+    batch_ids, batch_docs = [], []
+    writer = _EmbeddingWriter(vectordb, queue_size)
+    try:
+        for doc in page_docs:
+            page_key = str(doc.metadata["page"])
+            # A page's chunks also depend on the section it opens in
+            page_hash = sha256_text(
+                json.dumps([doc.page_content, section_path]) if section_path else doc.page_content
+            )
+            old_page = old_pages.get(page_key)
+            if (
+                old_page is not None
+                and old_page["sha256"] == page_hash
+                and all(chunk_id in stored_ids for chunk_id in old_page["chunks"])
+            ):
+                # Unchanged page whose chunks are all stored: nothing to split or embed
+                ids = old_page["chunks"]
+                section_path = old_page.get("section_path", section_path)
+            else:
+                chunks, section_path = split_page(doc, section_path)
+                ids = chunk_ids_for_page(chunks)
+                for chunk_id, chunk in zip(ids, chunks):
+                    if chunk_id in stored_ids or chunk_id in wanted_ids:
+                        continue
+                    batch_ids.append(chunk_id)
+                    batch_docs.append(chunk)
+                    if len(batch_ids) >= batch_size:
+                        writer.put(batch_ids, batch_docs)
+                        added += len(batch_ids)
+                        batch_ids, batch_docs = [], []
+            pages[page_key] = {"sha256": page_hash, "chunks": ids}
+            if section_path:
+                pages[page_key]["section_path"] = section_path
+            wanted_ids.update(ids)
+        if batch_ids:
+            writer.put(batch_ids, batch_docs)
+            added += len(batch_ids)
+    finally:
+        writer.close()
+
+    stale_ids = sorted(stored_ids - wanted_ids)
+    if stale_ids:
+        vectordb.delete(ids=stale_ids)
+
+    # Lexical index for hybrid retrieval, rebuilt over the whole collection
+    BM25Index.from_vectordb(vectordb).save(persist_directory)
+
+    save_manifest(persist_directory, {
+        "version": MANIFEST_VERSION,
+        "source": os.path.basename(pdf_path),
+        "pdf_sha256": pdf_hash,
+        "splitter": settings,
+        "pages": pages,
+    })
+
+    return vectordb, _stats(added, len(stale_ids), len(wanted_ids) - added, len(pages), started)
+
+
+def _stats(added, deleted, unchanged, pages, started):
+    elapsed = time.perf_counter() - started
+    return {
+        "added": added,
+        "deleted": deleted,
+        "unchanged": unchanged,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 1) if elapsed else 0.0,
+        "chunks_per_s": round(added / elapsed, 1) if elapsed else 0.0,
+    }
@@ -1,16 +1,15 @@
-<<<<<<< HEAD
-import requests
+import argparse
+import json
 import os
+import re
+
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from intent_client import CompletionClient, StubCompletionServer
 
 # Set Groq API Key
 api_key = os.getenv("GROQ_API_KEY")  # Ensure your Groq API key is set as an environment variable
-=======
-import openai
-import os
-
-# OpenAI API Key
-openai.api_key = os.getenv('OPENAI_API_KEY')  # Ensure your API key is set as an environment variable
->>>>>>> e927348dffe8d5e0652ed1bf11c3588bd1af679a
 
 # Define the few-shot prompt for intent classification
 FEW_SHOT_PROMPT = """
@@ -34,61 +33,164 @@ User Query: {query}
 Intent:
 """
 
+# Labelled examples for the local classifier
+INTENT_EXAMPLES = {
+    "Booking": [
+        "I want to book a hotel.",
+        "Reserve a table for two tonight.",
+        "Can I book a flight to Delhi next Monday?",
+        "I'd like to make a reservation.",
+        "Book me a room for three nights.",
+        "Is there availability for a doctor's appointment tomorrow?",
+        "Schedule a cab for 6 am.",
+        "I need two tickets for the evening show.",
+    ],
+    "Cancel": [
+        "Can you cancel my flight?",
+        "Please cancel my reservation.",
+        "I want to cancel the hotel booking.",
+        "Call off my appointment for tomorrow.",
+        "I no longer need the cab, cancel it.",
+        "How do I cancel my order?",
+        "Cancel my subscription.",
+        "Drop my booking for Friday.",
+    ],
+    "Feedback": [
+        "Your service is excellent.",
+        "The room was dirty and the staff was rude.",
+        "I loved the food at your restaurant.",
+        "The app keeps crashing, very disappointing.",
+        "Great experience, thank you!",
+        "The delivery was late again.",
+        "I want to share some feedback about my stay.",
+        "The support team was really helpful.",
+    ],
+}
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Below this confidence the local answer is replaced by the LLM's
+CONFIDENCE_THRESHOLD = 0.6
+
+# Shared client: keeps connections to the API alive between queries
+GROQ_INTENT_URL = "https://api.groq.com/v1/classify-intent"  # Replace with your actual URL
+client = CompletionClient(GROQ_INTENT_URL, api_key)
+
+
 def classify_intent(user_query):
-    # Format the prompt with the user query
+    # Format the prompt with the user query and send it to the Groq API
     prompt = FEW_SHOT_PROMPT.format(query=user_query)
+    return client.complete(prompt, max_tokens=50, temperature=0.7)
+
+
+def classify_intents_remote(queries, max_workers=8):
+    """Classify queries through the API with up to ``max_workers`` requests in flight."""
+    prompts = [FEW_SHOT_PROMPT.format(query=query) for query in queries]
+    return client.complete_many(prompts, max_workers=max_workers, max_tokens=50, temperature=0.7)
+
+
+class LocalIntentClassifier:
+    """Nearest-centroid intent classifier over sentence embeddings.
+
+    The labelled examples are embedded once; each label's centroid is the
+    normalised mean of its examples. A batch of queries is scored with a
+    single matrix product, and the confidence is the softmax over the
+    cosine scores of the labels.
+    """
+
+    def __init__(self, embeddings, examples=INTENT_EXAMPLES, temperature=0.05):
+        self.embeddings = embeddings
+        self.labels = list(examples)
+        self.temperature = temperature
+        centroids = []
+        for label in self.labels:
+            vectors = self._normalize(np.asarray(embeddings.embed_documents(examples[label]), dtype=np.float32))
+            centroids.append(vectors.mean(axis=0))
+        self.centroids = self._normalize(np.vstack(centroids))
+
+    @staticmethod
+    def _normalize(matrix):
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def classify(self, queries):
+        """Return a list of (intent, confidence) pairs, one per query."""
+        if not queries:
+            return []
+        vectors = self._normalize(np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32))
+        scores = vectors @ self.centroids.T / self.temperature
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[i], float(probabilities[row, i])) for row, i in enumerate(best)]
+
+    def match_label(self, reply):
+        """Map a free-form LLM reply onto one of ``labels`` by its first word, or None."""
+        words = re.findall(r"[A-Za-z]+", reply)
+        if not words:
+            return None
+        return next((label for label in self.labels if label.lower() == words[0].lower()), None)
+
+
+_local_classifier = None
+
+
+def get_local_classifier():
+    # The embedding model is loaded on first use and reused afterwards
+    global _local_classifier
+    if _local_classifier is None:
+        _local_classifier = LocalIntentClassifier(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL))
+    return _local_classifier
+
+
+def classify_intents(queries, threshold=CONFIDENCE_THRESHOLD):
+    """Classify a batch of queries locally, asking the LLM only about low-confidence ones.
+
+    Returns one dict per query with ``intent``, ``confidence`` and
+    ``source`` ("local" or "llm"). An LLM reply that is an error or not one
+    of the known labels leaves the local prediction in place.
+    """
+    classifier = get_local_classifier()
+    results = [
+        {"query": query, "intent": intent, "confidence": confidence, "source": "local"}
+        for query, (intent, confidence) in zip(queries, classifier.classify(queries))
+    ]
+    uncertain = [result for result in results if result["confidence"] < threshold]
+    for result, reply in zip(uncertain, classify_intents_remote([result["query"] for result in uncertain])):
+        intent = classifier.match_label(reply)
+        if intent is not None:
+            result["intent"] = intent
+            result["source"] = "llm"
+    return results
 
-<<<<<<< HEAD
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
-    # Prepare the request payload
-    data = {
-        "prompt": prompt,
-        "max_tokens": 50,
-        "temperature": 0.7
-    }
-
-    try:
-        # Send the request to the Groq API (URL will be handled externally)
-        response = requests.post("https://api.groq.com/v1/classify-intent", json=data, headers=headers)  # Replace <GROQ_API_URL> with your actual URL
-
-        # Check if the response is successful
-        if response.status_code == 200:
-            # Parse the JSON response
-            result = response.json()
-            intent = result.get("choices", [{}])[0].get("text", "").strip()
-            return intent
-        else:
-            return f"Error: API request failed with status code {response.status_code}"
-    except requests.exceptions.RequestException as e:
-        return f"Error: {str(e)}"
 
 # Test the system
 if __name__ == "__main__":
-    user_query = input("Enter a query: ")
-    result = classify_intent(user_query)
-    print(f"Intent Classification Result:\n{result}")
-=======
-    try:
-        # Use the correct completion endpoint
-        response = openai.Completion.create(
-            model="text-davinci-003",  # Use the appropriate model, "text-davinci-003" is an excellent choice for completions
-            prompt=prompt,
-            max_tokens=50,
-            temperature=0.7
-        )
-
-        # Extract the classification result from the response
-        intent = response.choices[0].text.strip()
-        return intent
-    except Exception as e:
-        return f"Error: {e}"
+    parser = argparse.ArgumentParser(description="Classify user queries into Booking/Cancel/Feedback.")
+    parser.add_argument("--file", help="classify every line of this file and print JSON lines")
+    parser.add_argument("--remote", action="store_true", help="send every query to the API instead of classifying locally")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent API requests for --remote")
+    parser.add_argument("--stub", action="store_true", help="send API requests to a local stub server")
+    args = parser.parse_args()
 
-# Test the system
-user_query = input("Enter a query: ")
-result = classify_intent(user_query)
-print(f"Intent Classification Result:\n{result}")
->>>>>>> e927348dffe8d5e0652ed1bf11c3588bd1af679a
+    if args.stub:
+        stub = StubCompletionServer().__enter__()
+        client = CompletionClient(stub.url, api_key)
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        if args.remote:
+            results = [
+                {"query": query, "intent": intent, "source": "llm"}
+                for query, intent in zip(queries, classify_intents_remote(queries, max_workers=args.workers))
+            ]
+        else:
+            results = classify_intents(queries)
+        for result in results:
+            print(json.dumps(result))
+    else:
+        user_query = input("Enter a query: ")
+        result = classify_intents([user_query])[0]
+        print(f"Intent Classification Result:\n{result['intent']} (confidence {result['confidence']:.2f}, {result['source']})")
@@ -0,0 +1,141 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CompletionClient:
+    """Pooled HTTP client for the remote completion endpoint.
+
+    One ``requests.Session`` keeps connections (and their TLS sessions)
+    alive across calls. Every request has a connect/read timeout, and 429
+    and 5xx responses or connection errors are retried with full-jitter
+    exponential backoff, honouring ``Retry-After`` when the server sends it.
+    """
+
+    def __init__(self, url, api_key, timeout=(3.05, 30), max_retries=4, backoff=0.5, pool_size=16):
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    def complete(self, prompt, max_tokens=50, temperature=0.7):
+        """Return the completion text, or an "Error: ..." string once retries are exhausted."""
+        data = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature}
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(self.url, json=data, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.max_retries:
+                    return f"Error: {str(e)}"
+                time.sleep(self._delay(attempt))
+                continue
+            except requests.exceptions.RequestException as e:
+                return f"Error: {str(e)}"
+
+            if response.status_code == 200:
+                result = response.json()
+                return result.get("choices", [{}])[0].get("text", "").strip()
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return f"Error: API request failed with status code {response.status_code}"
+            time.sleep(self._delay(attempt, response))
+
+    def complete_many(self, prompts, max_workers=8, **kwargs):
+        """Complete prompts concurrently (at most ``max_workers`` in flight), keeping their order."""
+        with ThreadPoolExecutor(max_workers=min(max_workers, self.pool_size)) as pool:
+            return list(pool.map(lambda prompt: self.complete(prompt, **kwargs), prompts))
+
+    def close(self):
+        self.session.close()
+
+
+class StubCompletionServer:
+    """Local stand-in for the completion endpoint, for tests and dry runs.
+
+    Answers with an intent picked by keyword from the last "User Query:"
+    line of the prompt. The first ``fail_first`` requests get
+    ``fail_status`` instead, so retry handling can be exercised.
+    """
+
+    KEYWORDS = (("cancel", "Cancel"), ("book", "Booking"), ("reserv", "Booking"))
+
+    def __init__(self, fail_first=0, fail_status=503, latency=0.0):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1/classify-intent"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests += 1
+                    failing = stub.requests <= stub.fail_first
+                time.sleep(stub.latency)
+                if failing:
+                    self._reply(stub.fail_status, {"error": "stub failure"}, {"Retry-After": "0"})
+                    return
+                query = body["prompt"].rsplit("User Query:", 1)[-1].lower()
+                intent = next((label for word, label in stub.KEYWORDS if word in query), "Feedback")
+                self._reply(200, {"choices": [{"text": f" {intent}\n"}]})
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,177 @@
+import re
+
+from pypdf import PdfReader
+
+# Only allowance, accommodation, DA and travel-mode questions are resolved;
+# everything else is left to the RAG chain
+ALLOWANCE_PATTERN = re.compile(
+    r"\b(allowances?|accommodation|hotel|lodging|per night|da|daily allowance|per diem|"
+    r"(mode|class) of (travel|transport)|travel (mode|class|allowance)|(air|train|flight) travel|"
+    r"(travel|go|fly) by (air|train|flight))\b"
+)
+
+CLASS_PATTERN = re.compile(r"\bclass\s*([abc])\b(?:\s*city)?", re.IGNORECASE)
+# Other names of the cities in the classification table
+CITY_ALIASES = {
+    "delhi": "new delhi",
+    "bombay": "mumbai",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+    "cochin": "kochi",
+    "thiruvananthapuram": "trivandrum",
+}
+# Words a direct (city, designation) lookup may contain besides the
+# allowance terms, designation and city; any other word means the question
+# asks something the table row does not answer
+LOOKUP_WORDS = frozenset("""
+    what whats which how much is are the a an for of in to at and my our i we me am as
+    do does can get gets getting given allowed entitled eligible applicable
+    rs rupees per night day daily limit limits amount rate rates maximum max
+    please tell know when while travelling traveling visiting going trip tour official stay staying
+    employee employees staff grade designation level city
+""".split())
+ROW_PATTERN = re.compile(r"\b([ABC])\s+(\d+)\s+(\d+)\b")
+
+
+def normalize(text):
+    text = text.lower().replace("-", " ")
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def designation_aliases(name):
+    """Spellings a user may type for one entry of a designation cell."""
+    base = normalize(name)
+    variants = {base}
+    variants.add(re.sub(r"\bsr\b", "senior", base))
+    variants.add(re.sub(r"\basst\b", "assistant", base))
+    variants.add(base.replace("dietitian", "dietician"))
+    variants.add(base.replace("in charge", "incharge"))
+    # Singular forms: "managers" -> "manager", "cxos" -> "cxo"
+    variants.update(re.sub(r"s\b", "", variant) for variant in list(variants))
+    return {variant for variant in variants if variant}
+
+
+class AllowanceTable:
+    """Grid B (outstation allowances) and the city classification of tables.pdf.
+
+    ``rows`` maps (designation, city class) to the accommodation limit,
+    daily allowance and mode of travel; ``aliases`` maps every normalised
+    designation spelling to its Grid B row label and ``city_classes`` maps
+    city names to A or B. Questions naming a city that is not in the
+    table (other than as "class C") are not resolved, since the table
+    cannot tell a misspelt or unknown city from a class C one. Only plain
+    lookups are resolved: every word of the question must be an allowance
+    term, the designation, the city or one of ``LOOKUP_WORDS``.
+    """
+
+    def __init__(self, rows, aliases, city_classes):
+        self.rows = rows
+        self.aliases = aliases
+        self.city_classes = city_classes
+        # Every spelling of a listed city, longest first so "new delhi" wins over "delhi"
+        self._city_names = {name: name for name in city_classes}
+        self._city_names.update((alias, name) for alias, name in CITY_ALIASES.items() if name in city_classes)
+        self._city_pattern = re.compile(
+            r"\b(" + "|".join(re.escape(name) for name in sorted(self._city_names, key=len, reverse=True)) + r")\b"
+        )
+        # Longest alias first so "sr executive" wins over "executive"
+        self._alias_pattern = re.compile(
+            r"\b(" + "|".join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True)) + r")\b"
+        )
+
+    @classmethod
+    def from_pdf(cls, pdf_path):
+        for page in PdfReader(pdf_path).pages:
+            text = page.extract_text()
+            if "Grid B" in text and "city classification" in text:
+                return cls.from_text(text)
+        raise ValueError(f"No Grid B table found in {pdf_path}")
+
+    @classmethod
+    def from_text(cls, text):
+        grid = text.split("Grid B", 1)[1]
+        grid, cities = grid.split("city classification", 1)
+        grid = grid.split("Mode Of Travel", 1)[1]
+
+        rows = {}
+        aliases = {}
+        matches = list(ROW_PATTERN.finditer(grid))
+        # Each designation spans three matches (classes A, B, C); the
+        # designation text precedes A and the mode of travel follows it
+        previous_end = 0
+        for start in range(0, len(matches) - 2, 3):
+            a, b, c = matches[start:start + 3]
+            label = re.sub(r"\s+", " ", grid[previous_end:a.start()]).strip()
+            mode = re.sub(r"\s+", " ", grid[a.end():b.start()]).strip()
+            mode = re.sub(r"\s*/\s*", " / ", mode)
+            label = re.sub(r"\s*/\s*", " / ", label).replace(" -", "-")
+            for match in (a, b, c):
+                rows[(label, match.group(1))] = {
+                    "accommodation": int(match.group(2)),
+                    "daily_allowance": int(match.group(3)),
+                    "mode_of_travel": mode,
+                }
+            for name in label.split("/"):
+                for alias in designation_aliases(name):
+                    aliases.setdefault(alias, label)
+            previous_end = c.end()
+
+        city_classes = {}
+        for line in cities.splitlines():
+            match = re.match(r"\s*([AB])\s+(.+)", line)
+            if match:
+                for city in re.split(r",|\band\b", match.group(2)):
+                    if city.strip():
+                        city_classes[normalize(city)] = match.group(1)
+        return cls(rows, aliases, city_classes)
+
+    def resolve(self, question):
+        """Return (city, city class, designation, row), or None unless the question is a plain lookup of all three."""
+        normalized = normalize(question)
+        terms = list(ALLOWANCE_PATTERN.finditer(normalized))
+        if not terms:
+            return None
+
+        designation_match = self._alias_pattern.search(normalized)
+        if designation_match is None:
+            return None
+        designation = self.aliases[designation_match.group(1)]
+
+        city_match = self._city_pattern.search(normalized)
+        class_match = CLASS_PATTERN.search(normalized)
+        if city_match is not None:
+            place_match = city_match
+            city = self._city_names[city_match.group(1)]
+            city_class = self.city_classes[city]
+            city = city.title()
+        elif class_match is not None:
+            place_match = class_match
+            city, city_class = f"Class {class_match.group(1).upper()} city", class_match.group(1).upper()
+        else:
+            return None
+
+        # Whatever is left must be filler: a condition ("if they are not
+        # eligible"), another question ("taxable") or the rest of a longer
+        # place name ("Navi Mumbai") is for the RAG chain
+        rest = normalized
+        for match in sorted([*terms, designation_match, place_match], key=lambda m: m.start(), reverse=True):
+            rest = rest[:match.start()] + " " + rest[match.end():]
+        if any(word not in LOOKUP_WORDS for word in rest.split()):
+            return None
+
+        return city, city_class, designation, self.rows[(designation, city_class)]
+
+    def answer(self, question):
+        resolved = self.resolve(question)
+        if resolved is None:
+            return None
+        city, city_class, designation, row = resolved
+        return (
+            "As per Grid B of the NU Hospitals HR manual:\n\n"
+            "| City | City class | Designation/Grade | Accommodation (Rs. per night) "
+            "| Daily allowance (Rs.) | Mode of travel |\n"
+            "|---|---|---|---|---|---|\n"
+            f"| {city} | {city_class} | {designation} | {row['accommodation']} "
+            f"| {row['daily_allowance']} | {row['mode_of_travel']} |"
+        )
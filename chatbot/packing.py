@@ -0,0 +1,125 @@
+import re
+import threading
+
+from langchain_core.documents import Document
+
+from history import estimate_tokens
+
+
+def overlap_length(a, b, min_chars=20):
+    """Length of the longest suffix of ``a`` that is also a prefix of ``b``, or 0 below ``min_chars``."""
+    if len(b) < min_chars:
+        return 0
+    head = b[:min_chars]
+    start = a.find(head, max(0, len(a) - len(b)))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(head, start + 1)
+    return 0
+
+
+def shingles(text, size=3):
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+class ContextPacker:
+    """Packs retrieved chunks into the ``{context}`` of the answer prompt.
+
+    Chunks come in relevance order. Chunks from the same page that are
+    neighbours (consecutive ``chunk_index`` from the layout splitter, or
+    text overlapping by the recursive splitter's ``chunk_overlap``) are
+    merged into one passage at the rank of the better one.
+    Chunks contained in, or with a 3-word shingle Jaccard similarity of at
+    least ``duplicate_threshold`` to, an earlier passage are dropped. The
+    passages are then taken in order while they fit in ``token_budget``;
+    one that does not fit is skipped so smaller ones after it can still be
+    used, and the best passage is truncated rather than left out.
+    """
+
+    def __init__(self, token_budget=1200, min_overlap=20, duplicate_threshold=0.8):
+        self.token_budget = token_budget
+        self.min_overlap = min_overlap
+        self.duplicate_threshold = duplicate_threshold
+        self.chunks_in = 0
+        self.chunks_out = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self._lock = threading.Lock()
+
+    def _merge(self, passage, doc):
+        """Return the merged text if ``doc`` continues or precedes ``passage``, else None."""
+        if passage.metadata.get("source") != doc.metadata.get("source") or \
+                passage.metadata.get("page") != doc.metadata.get("page"):
+            return None
+        a, b = passage.page_content, doc.page_content
+        # Layout chunks do not overlap but record their position on the page
+        first, count = passage.metadata.get("chunk_index"), passage.metadata.get("merged", 1)
+        index = doc.metadata.get("chunk_index")
+        if first is not None and index is not None:
+            if index == first + count:
+                return a + "\n\n" + b
+            if index == first - 1:
+                return b + "\n\n" + a
+        if overlap := overlap_length(a, b, self.min_overlap):
+            return a + b[overlap:]
+        if overlap := overlap_length(b, a, self.min_overlap):
+            return b + a[overlap:]
+        return None
+
+    def _is_duplicate(self, passage, doc, doc_shingles):
+        if doc.page_content in passage.page_content:
+            return True
+        passage_shingles = shingles(passage.page_content)
+        return len(doc_shingles & passage_shingles) / len(doc_shingles | passage_shingles) >= self.duplicate_threshold
+
+    def pack(self, docs):
+        passages = []
+        for doc in docs:
+            doc_shingles = shingles(doc.page_content)
+            for i, passage in enumerate(passages):
+                if self._is_duplicate(passage, doc, doc_shingles):
+                    break
+                merged = self._merge(passage, doc)
+                if merged is not None:
+                    metadata = {**passage.metadata, "merged": passage.metadata.get("merged", 1) + 1}
+                    if doc.metadata.get("chunk_index") is not None and passage.metadata.get("chunk_index") is not None:
+                        metadata["chunk_index"] = min(doc.metadata["chunk_index"], passage.metadata["chunk_index"])
+                    passages[i] = Document(page_content=merged, metadata=metadata, id=passage.id)
+                    break
+            else:
+                passages.append(doc)
+
+        packed = []
+        budget = self.token_budget
+        for passage in passages:
+            tokens = estimate_tokens(passage.page_content)
+            if tokens <= budget:
+                packed.append(passage)
+                budget -= tokens
+            elif not packed:
+                # Keep the most relevant passage even when it alone is over budget
+                packed.append(Document(
+                    page_content=passage.page_content[:budget * 4],
+                    metadata={**passage.metadata, "truncated": True},
+                    id=passage.id,
+                ))
+                budget = 0
+
+        with self._lock:
+            self.chunks_in += len(docs)
+            self.chunks_out += len(packed)
+            self.tokens_in += sum(estimate_tokens(doc.page_content) for doc in docs)
+            self.tokens_out += sum(estimate_tokens(doc.page_content) for doc in packed)
+        return packed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chunks_in": self.chunks_in,
+                "chunks_out": self.chunks_out,
+                "tokens_in": self.tokens_in,
+                "tokens_out": self.tokens_out,
+                "token_savings": 1 - self.tokens_out / self.tokens_in if self.tokens_in else 0.0,
+            }
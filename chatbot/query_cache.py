@@ -0,0 +1,79 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+
+def normalize_question(question):
+    """Collapse whitespace, drop trailing punctuation and lowercase, so trivially different spellings share a key."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.! ").lower()
+
+
+class LRUCache:
+    """Bounded, thread-safe mapping that evicts the least recently used entry.
+
+    ``get`` returns None on a miss; hits and misses are counted so the hit
+    rate can be monitored.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class RewriteCache(LRUCache):
+    """Standalone questions produced by the rewrite LLM call.
+
+    Keyed on the normalized follow-up question and a digest of the last
+    ``window`` chat messages, which is all the rewrite usually depends on.
+    The rewrite prompt is the same for every bot, so one cache can serve
+    all of them.
+    """
+
+    def __init__(self, max_entries=1024, window=4):
+        super().__init__(max_entries)
+        self.window = window
+
+    def key(self, question, chat_history=()):
+        recent = list(chat_history or ())[-self.window:]
+        history = hashlib.sha256(
+            "\x1e".join(f"{m.type}\x1f{m.content}" for m in recent).encode("utf-8")
+        ).hexdigest()
+        return history, normalize_question(question)
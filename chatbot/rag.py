@@ -0,0 +1,238 @@
+import re
+import threading
+import time
+from contextlib import nullcontext
+from operator import itemgetter
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableBranch, RunnableGenerator, RunnableLambda
+from langchain_core.runnables.utils import AddableDict
+
+from history import estimate_tokens
+
+
+# Words and openings that make a question depend on earlier turns
+FOLLOW_UP_WORDS = frozenset({
+    "it", "its", "this", "that", "these", "those", "they", "them", "their",
+    "he", "him", "his", "she", "her", "there", "same", "above", "previous",
+    "former", "latter", "else",
+})
+FOLLOW_UP_PREFIXES = ("and ", "or ", "but ", "also ", "so ", "then ", "what about", "how about")
+
+
+class RewriteGate:
+    """Decides whether a question has to go through the rewrite LLM call.
+
+    The rewrite is skipped when there is no chat history, or when the
+    question is long enough and has no pronoun or connective pointing back
+    at earlier turns. Counters are kept so the skip rate can be monitored.
+    """
+
+    def __init__(self, min_words=4):
+        self.min_words = min_words
+        self.skipped_no_history = 0
+        self.skipped_self_contained = 0
+        self.rewritten = 0
+        self._lock = threading.Lock()
+
+    def is_self_contained(self, question):
+        question = question.strip().lower()
+        words = re.findall(r"[a-z']+", question)
+        return (
+            len(words) >= self.min_words
+            and not question.startswith(FOLLOW_UP_PREFIXES)
+            and not any(word in FOLLOW_UP_WORDS for word in words)
+        )
+
+    def needs_rewrite(self, inputs):
+        if not inputs.get("chat_history"):
+            counter = "skipped_no_history"
+        elif self.is_self_contained(inputs["input"]):
+            counter = "skipped_self_contained"
+        else:
+            counter = "rewritten"
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        return counter == "rewritten"
+
+    def stats(self):
+        with self._lock:
+            total = self.skipped_no_history + self.skipped_self_contained + self.rewritten
+            return {
+                "skipped_no_history": self.skipped_no_history,
+                "skipped_self_contained": self.skipped_self_contained,
+                "rewritten": self.rewritten,
+                "skip_rate": (total - self.rewritten) / total if total else 0.0,
+            }
+
+
+def build_condense_question_chain(llm, contextualize_q_prompt, rewrite_gate=None, rewrite_cache=None):
+    # Same routing as create_history_aware_retriever, but it returns the
+    # standalone question instead of documents so callers can key on it
+    rewrite_gate = rewrite_gate or RewriteGate()
+    rewrite = contextualize_q_prompt | llm | StrOutputParser()
+
+    def cached_rewrite(inputs, config):
+        key = rewrite_cache.key(inputs["input"], inputs.get("chat_history"))
+        question = rewrite_cache.get(key)
+        if question is None:
+            question = rewrite.invoke(inputs, config)
+            rewrite_cache.put(key, question)
+        return question
+
+    return RunnableBranch(
+        (lambda x: not rewrite_gate.needs_rewrite(x), itemgetter("input")),
+        RunnableLambda(cached_rewrite) if rewrite_cache is not None else rewrite,
+    )
+
+
+def format_docs(docs):
+    # Same layout create_stuff_documents_chain uses by default
+    return "\n\n".join(doc.page_content for doc in docs)
+
+
+def _stage(trace, name):
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+def _record(trace, **fields):
+    if trace is not None:
+        trace.set(**fields)
+
+
+def build_rag_chain(
+    llm, retriever, contextualize_q_prompt, qa_prompt,
+    answer_cache=None, rewrite_gate=None, resolver=None, tracer=None, single_flight=None,
+    context_packer=None, rewrite_cache=None,
+):
+    """Conversational RAG chain: condense question -> retrieve -> answer.
+
+    Drop-in replacement for ``create_retrieval_chain(history_aware_retriever,
+    question_answer_chain)``: it takes ``input``/``chat_history`` and returns
+    ``context`` and ``answer``, plus the ``standalone_question`` and whether
+    the answer came from ``answer_cache``. ``rewrite_gate`` decides which
+    questions skip the rewrite LLM call; ``rewrite_cache`` (a
+    query_cache.RewriteCache) memoizes the ones that do not. ``resolver`` maps a standalone
+    question to a deterministic answer, or None to fall through to the
+    cache and retrieval. ``tracer`` records per-stage timings and sizes of
+    every question. ``single_flight`` lets identical concurrent questions
+    share one cache lookup, retrieval and answer; that shared work is then
+    traced once, in a shared trace of its own. ``context_packer`` merges,
+    de-duplicates and budgets the retrieved chunks before they are stuffed
+    into the prompt. When streamed, the answer arrives as
+    ``{"answer": token}`` chunks after one chunk carrying everything else.
+    """
+    condense_question = build_condense_question_chain(llm, contextualize_q_prompt, rewrite_gate, rewrite_cache)
+
+    def run(input_chunks, config):
+        inputs = {}
+        for chunk in input_chunks:
+            inputs.update(chunk)
+
+        trace = tracer.start() if tracer is not None else None
+
+        try:
+            with _stage(trace, "rewrite"):
+                question = condense_question.invoke(inputs, config)
+            _record(trace, question=question, rewritten=question != inputs["input"])
+            result = AddableDict(inputs, standalone_question=question)
+
+            if resolver is not None:
+                with _stage(trace, "resolve"):
+                    resolved = resolver(question)
+                if resolved is not None:
+                    _record(trace, resolved=True)
+                    yield AddableDict(result, context=[], cached=False, answer=resolved)
+                    return
+
+            def answer(trace):
+                # Everything after the rewrite depends only on the question,
+                # history and collection, so concurrent duplicates can share it
+                if answer_cache is not None:
+                    with _stage(trace, "cache_lookup"):
+                        cached = answer_cache.lookup(question)
+                    if cached is not None:
+                        _record(trace, cached=True)
+                        yield {"context": [], "cached": True, "answer": cached}
+                        return
+
+                with _stage(trace, "retrieve"):
+                    docs = retriever.invoke(question, config)
+                _record(trace, chunks=len(docs))
+                if context_packer is not None:
+                    with _stage(trace, "pack"):
+                        docs = context_packer.pack(docs)
+                    _record(trace, packed_chunks=len(docs))
+                yield {"context": docs, "cached": False}
+
+                with _stage(trace, "stuff"):
+                    context = format_docs(docs)
+                    prompt_value = qa_prompt.invoke({**inputs, "context": context}, config)
+                _record(trace, context_chars=len(context), context_tokens=estimate_tokens(context))
+
+                text = ""
+                usage = None
+                with _stage(trace, "generate"):
+                    for chunk in llm.stream(prompt_value, config):
+                        if chunk.usage_metadata:
+                            usage = chunk.usage_metadata
+                        if chunk.content:
+                            text += chunk.content
+                            yield {"answer": chunk.content}
+                _record(
+                    trace,
+                    prompt_tokens=usage["input_tokens"] if usage else estimate_tokens(prompt_value.to_string()),
+                    completion_tokens=usage["output_tokens"] if usage else estimate_tokens(text),
+                )
+
+                if answer_cache is not None:
+                    answer_cache.store(question, text)
+
+            def shared_answer():
+                # Runs on the SingleFlight worker, which may outlive every
+                # caller, so it records into its own trace
+                shared_trace = tracer.start(shared=True) if tracer is not None else None
+                try:
+                    yield from answer(shared_trace)
+                finally:
+                    if shared_trace is not None:
+                        shared_trace.finish()
+
+            if single_flight is None:
+                chunks = answer(trace)
+            else:
+                key = single_flight.key(question, inputs.get("chat_history"))
+                chunks = single_flight.stream(key, shared_answer)
+            # The first chunk carries context and flags; the rest are answer tokens
+            for i, chunk in enumerate(chunks):
+                if i == 0:
+                    yield AddableDict(result, **chunk)
+                    continue
+                if trace is not None:
+                    trace.mark("first_token")
+                yield AddableDict(chunk)
+        finally:
+            if trace is not None:
+                trace.finish()
+
+    return RunnableGenerator(run, name="conversational_rag")
+
+
+def stream_answer(chain, inputs, config, timings):
+    """Yield answer tokens from ``chain.stream`` and record latency in ``timings``.
+
+    ``timings["first_token"]`` is the time to the first answer token and
+    ``timings["total"]`` the time until the stream finished, both in seconds.
+    """
+    started = time.perf_counter()
+    for chunk in chain.stream(inputs, config=config):
+        token = chunk.get("answer")
+        if token:
+            timings.setdefault("first_token", time.perf_counter() - started)
+            yield token
+    timings["total"] = time.perf_counter() - started
+
+
+def warm_up(retriever, query="leave policy"):
+    """Run one retrieval so the embedding model and vector index are loaded up front."""
+    retriever.invoke(query)
@@ -0,0 +1,153 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from vector_index import mmr, stored_vectors
+
+BM25_INDEX_NAME = "bm25_index.json"
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+class BM25Index:
+    """Compact in-memory inverted index over the chunks of one collection.
+
+    BM25 weights are computed once at build time, so a query only sums the
+    precomputed posting weights of its terms into a score vector.
+    """
+
+    def __init__(self, ids, texts, metadatas, postings):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        # term -> (doc positions, weights) as numpy arrays
+        self.postings = {
+            term: (np.asarray(docs, dtype=np.int32), np.asarray(weights, dtype=np.float32))
+            for term, (docs, weights) in postings.items()
+        }
+
+    @classmethod
+    def build(cls, ids, texts, metadatas, k1=1.5, b=0.75):
+        term_counts = [Counter(tokenize(text)) for text in texts]
+        doc_lengths = [sum(counts.values()) for counts in term_counts]
+        avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+        document_frequency = Counter(term for counts in term_counts for term in counts)
+        n = len(texts)
+        postings = defaultdict(lambda: ([], []))
+        for position, counts in enumerate(term_counts):
+            norm = k1 * (1 - b + b * doc_lengths[position] / avg_length) if avg_length else k1
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                docs, weights = postings[term]
+                docs.append(position)
+                weights.append(round(idf * tf * (k1 + 1) / (tf + norm), 4))
+        return cls(ids, texts, metadatas, dict(postings))
+
+    @classmethod
+    def from_vectordb(cls, vectordb):
+        data = vectordb.get(include=["documents", "metadatas"])
+        return cls.build(data["ids"], data["documents"], [m or {} for m in data["metadatas"]])
+
+    def to_dict(self):
+        return {
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "postings": {
+                term: [docs.tolist(), weights.tolist()] for term, (docs, weights) in self.postings.items()
+            },
+        }
+
+    @staticmethod
+    def write(persist_directory, data):
+        """Save an index given as ``to_dict()`` output, without building it."""
+        path = os.path.join(persist_directory, BM25_INDEX_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def save(self, persist_directory):
+        self.write(persist_directory, self.to_dict())
+
+    @classmethod
+    def load(cls, persist_directory):
+        with open(os.path.join(persist_directory, BM25_INDEX_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["ids"], data["texts"], data["metadatas"], data["postings"])
+
+    def search(self, query, k=20):
+        """Return up to ``k`` (position, score) pairs, best first."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(scores[matched], -k)[-k:]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(int(position), float(scores[position])) for position in order]
+
+    def document(self, position):
+        return Document(id=self.ids[position], page_content=self.texts[position], metadata=self.metadatas[position])
+
+
+class HybridRetriever(BaseRetriever):
+    """Dense Chroma search fused with BM25 by reciprocal-rank fusion.
+
+    Both sides return ``fetch_k`` candidates; each candidate scores
+    ``1 / (rrf_k + rank)`` per list it appears in and the best ``k`` win.
+
+    With ``mmr_lambda`` set, the best ``k`` are instead picked by maximal
+    marginal relevance from the top ``mmr_fetch_k`` fused candidates:
+    relevance is the fused score scaled to [0, 1] and redundancy the
+    cosine similarity of the candidates' stored embeddings, so
+    near-copies of an already picked chunk give way to other passages.
+    Lower ``mmr_lambda`` favours diversity, 1 keeps the fused order.
+    """
+
+    vectordb: Any
+    bm25: Any
+    k: int = 4
+    fetch_k: int = 20
+    rrf_k: int = 60
+    mmr_lambda: Optional[float] = None
+    mmr_fetch_k: int = 20
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        fused = defaultdict(float)
+        documents = {}
+
+        for rank, doc in enumerate(self.vectordb.similarity_search(query, k=self.fetch_k)):
+            key = doc.id or doc.page_content
+            fused[key] += 1.0 / (self.rrf_k + rank + 1)
+            documents[key] = doc
+
+        for rank, (position, _) in enumerate(self.bm25.search(query, k=self.fetch_k)):
+            key = self.bm25.ids[position]
+            fused[key] += 1.0 / (self.rrf_k + rank + 1)
+            if key not in documents:
+                documents[key] = self.bm25.document(position)
+
+        ranked = sorted(fused, key=fused.get, reverse=True)
+        if self.mmr_lambda is None or len(ranked) <= self.k:
+            return [documents[key] for key in ranked[:self.k]]
+
+        pool = ranked[:max(self.k, self.mmr_fetch_k)]
+        scores = np.array([fused[key] for key in pool])
+        spread = scores[0] - scores[-1]
+        relevance = (scores - scores[-1]) / spread if spread else np.ones(len(pool))
+        picks = mmr(relevance, stored_vectors(self.vectordb, pool), k=self.k, lambda_mult=self.mmr_lambda)
+        return [documents[pool[i]] for i in picks]
@@ -0,0 +1,269 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_groq import ChatGroq
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from answer_cache import SemanticAnswerCache
+from bots import BOT_CONFIGS, CONTEXTUALIZE_Q_SYSTEM_PROMPT
+from coalescing import SingleFlight
+from embedding_cache import CachedEmbeddings
+from history import ChatHistoryStore
+from ingestion import collection_version, splitter_settings, sync_chroma_db
+from nu_tables import AllowanceTable
+from packing import ContextPacker
+from query_cache import RewriteCache
+from rag import RewriteGate, build_rag_chain, stream_answer, warm_up
+from retrievers import BM25Index, HybridRetriever
+from snapshot import SNAPSHOT_SUFFIX, SnapshotMismatch, SnapshotVectorStore, import_snapshot
+from tracing import Tracer
+from vector_index import MmapVectorStore, QuantizedVectorStore
+
+# Load Environment Variables
+load_dotenv()
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+LLM_MODEL = "llama3-8b-8192"
+
+# Semantic answer cache settings
+ANSWER_CACHE_THRESHOLD = 0.95
+ANSWER_CACHE_TTL = 3600
+
+# In-memory LRUs shared by all bots: query embeddings by normalized question,
+# and rewritten questions by (last REWRITE_CACHE_WINDOW messages, question)
+QUERY_EMBEDDING_CACHE_SIZE = 2048
+REWRITE_CACHE_SIZE = 2048
+REWRITE_CACHE_WINDOW = 4
+
+# Chat history kept verbatim per session; older turns are summarized
+HISTORY_MAX_TURNS = 6
+HISTORY_MAX_TOKENS = 1500
+
+# Page/section/table-aware chunking; see chunking.LayoutSplitter
+CHUNKER = "layout"
+CHUNK_SIZE = 1500
+
+# Dense search backend: "chroma", "exact" (memory-mapped exact search,
+# vector_index.MmapVectorStore), a compact "int8"/"float16" copy of the
+# collection (vector_index.QuantizedVectorStore), or "auto": exact up to
+# EXACT_INDEX_MAX_CHUNKS chunks and Chroma above. Bots may override it
+VECTOR_STORAGE = "auto"
+EXACT_INDEX_MAX_CHUNKS = 20000
+
+# Prebuilt collection snapshots (see snapshot.py), one "<bot id>.ragsnap"
+# per bot; bots may point "snapshot" elsewhere. A snapshot matching the PDF
+# is searched in place at startup instead of re-ingesting
+SNAPSHOT_DIR = "./snapshots"
+
+# MMR re-ranking of the fused retrieval candidates (None disables it); see
+# retrievers.HybridRetriever
+MMR_LAMBDA = 0.5
+MMR_FETCH_K = 20
+
+# Prompt tokens available for retrieved context after merging and de-duplication
+CONTEXT_TOKEN_BUDGET = 1500
+
+# Session histories persisted on disk; idle ones are dropped from memory
+HISTORY_DIR = "./chat_history"
+HISTORY_SHARDS = 8
+HISTORY_IDLE_SECONDS = 1800
+
+# Per-stage latency metrics and slow-trace dumps, one pair of files per bot
+METRICS_DIR = "./metrics"
+SLOW_TRACE_SECONDS = 8
+
+
+def build_prompt(system_prompt):
+    return ChatPromptTemplate.from_messages([
+        ("system", system_prompt),
+        MessagesPlaceholder("chat_history"),
+        ("human", "{input}"),
+    ])
+
+
+class Bot:
+    """One hosted collection with its own prompt, chain, caches and metrics."""
+
+    def __init__(self, bot_id, config, service):
+        self.bot_id = bot_id
+        self.config = config
+        self.service = service
+        self.answer_cache = SemanticAnswerCache(
+            service.embeddings, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL
+        )
+        self.rewrite_gate = RewriteGate()
+        self.single_flight = SingleFlight()
+        self.context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+        self.tracer = Tracer(
+            metrics_path=os.path.join(METRICS_DIR, f"{bot_id}.json"),
+            slow_trace_path=os.path.join(METRICS_DIR, f"{bot_id}_slow_traces.jsonl"),
+            slow_threshold=SLOW_TRACE_SECONDS,
+        )
+        self.qa_prompt = build_prompt(config["system_prompt"])
+        self.pdf_mtime = None
+        self.sync_stats = None
+        self.snapshot = None
+        self.chain = None
+        self.conversational_chain = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Build the chain on first use and re-sync the store when the PDF changed on disk."""
+        pdf_path = self.config["pdf_path"]
+        chroma_db_path = self.config["chroma_db_path"]
+        with self._lock:
+            pdf_mtime = os.path.getmtime(pdf_path)
+            if pdf_mtime == self.pdf_mtime:
+                return
+            storage = self.config.get("vector_storage", VECTOR_STORAGE)
+            open_store = None
+            snapshot_status = None
+            if storage != "chroma":
+                open_store = lambda version: self._open_local_store(version, storage)
+            if storage in ("auto", "exact"):
+                snapshot_status = self._restore_snapshot()
+            vectordb, self.sync_stats = sync_chroma_db(
+                pdf_path, chroma_db_path, self.service.embeddings, chunk_size=CHUNK_SIZE, chunker=CHUNKER,
+                open_store=open_store,
+            )
+            if snapshot_status is not None:
+                self.sync_stats["snapshot"] = snapshot_status
+            version = collection_version(chroma_db_path)
+            self.answer_cache.ensure_version(version)
+            self.single_flight.ensure_version(version)
+
+            if not isinstance(vectordb, MmapVectorStore):
+                if storage == "auto":
+                    chunks = self.sync_stats["added"] + self.sync_stats["unchanged"]
+                    storage = "exact" if chunks <= EXACT_INDEX_MAX_CHUNKS else "chroma"
+                if storage == "exact":
+                    vectordb = MmapVectorStore.from_vectordb(
+                        vectordb, self.service.embeddings, chroma_db_path, version=version
+                    )
+                elif storage != "chroma":
+                    vectordb = QuantizedVectorStore.from_vectordb(
+                        vectordb, self.service.embeddings, chroma_db_path, dtype=storage, version=version
+                    )
+
+            retriever = HybridRetriever(
+                vectordb=vectordb, bm25=BM25Index.load(chroma_db_path),
+                mmr_lambda=MMR_LAMBDA, mmr_fetch_k=MMR_FETCH_K,
+            )
+            resolver = AllowanceTable.from_pdf(pdf_path).answer if self.config.get("table_resolver") else None
+            self.chain = build_rag_chain(
+                self.service.llm, retriever, self.service.contextualize_q_prompt, self.qa_prompt,
+                answer_cache=self.answer_cache, rewrite_gate=self.rewrite_gate,
+                resolver=resolver, tracer=self.tracer, single_flight=self.single_flight,
+                context_packer=self.context_packer, rewrite_cache=self.service.rewrite_cache,
+            )
+            self.conversational_chain = RunnableWithMessageHistory(
+                self.chain,
+                self.service.get_session_history,
+                input_messages_key="input",
+                history_messages_key="chat_history",
+                output_messages_key="answer",
+            )
+
+            # Load model weights and open the index before the first question arrives
+            warm_up(retriever)
+            self.pdf_mtime = pdf_mtime
+
+    def _restore_snapshot(self):
+        """Import this bot's snapshot if it matches the PDF; returns its status, or None without one."""
+        self.snapshot = None
+        path = self.config.get("snapshot", os.path.join(SNAPSHOT_DIR, self.bot_id + SNAPSHOT_SUFFIX))
+        if not os.path.exists(path):
+            return None
+        try:
+            self.snapshot, status = import_snapshot(
+                path, self.config["chroma_db_path"], self.config["pdf_path"], EMBEDDING_MODEL,
+                splitter=splitter_settings(CHUNK_SIZE, chunker=CHUNKER),
+            )
+            return status
+        except SnapshotMismatch as e:
+            # Stale snapshot: fall back to syncing from the PDF
+            return f"ignored ({e})"
+
+    def _open_local_store(self, version, storage):
+        """Open an up-to-date exact index, snapshot or compact copy directly, skipping the Chroma client."""
+        chroma_db_path = self.config["chroma_db_path"]
+        if storage not in ("auto", "exact"):
+            return QuantizedVectorStore.open(chroma_db_path, self.service.embeddings, version, dtype=storage)
+        store = MmapVectorStore.open(chroma_db_path, self.service.embeddings, version)
+        if store is None and self.snapshot is not None and self.snapshot.version == version:
+            store = SnapshotVectorStore(self.snapshot, self.service.embeddings)
+        if store is not None and storage == "auto" and len(store) > EXACT_INDEX_MAX_CHUNKS:
+            return None
+        return store
+
+
+class RAGService:
+    """Hosts every bot in one process.
+
+    All bots share one embedding model (and its on-disk and query caches),
+    one LLM client with its connection pool and the rewrite cache; each bot
+    keeps its own collection,
+    system prompt, answer cache and metrics. Requests are routed by bot id.
+    ``session_history`` maps a session id to its chat history; by default
+    histories are persisted in a ChatHistoryStore under ``HISTORY_DIR``.
+    """
+
+    def __init__(self, bot_configs=BOT_CONFIGS, llm=None, embeddings=None, session_history=None):
+        self.bot_configs = bot_configs
+        self.llm = llm or ChatGroq(groq_api_key=os.getenv("GROQ_API_KEY"), model_name=LLM_MODEL)
+        self.embeddings = embeddings or CachedEmbeddings(
+            HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), EMBEDDING_MODEL,
+            query_cache_size=QUERY_EMBEDDING_CACHE_SIZE,
+        )
+        self.rewrite_cache = RewriteCache(REWRITE_CACHE_SIZE, window=REWRITE_CACHE_WINDOW)
+        self.contextualize_q_prompt = build_prompt(CONTEXTUALIZE_Q_SYSTEM_PROMPT)
+        self.history_store = None
+        if session_history is None:
+            self.history_store = ChatHistoryStore(
+                HISTORY_DIR, self.llm, shards=HISTORY_SHARDS, max_turns=HISTORY_MAX_TURNS,
+                max_tokens=HISTORY_MAX_TOKENS, idle_seconds=HISTORY_IDLE_SECONDS,
+            )
+            session_history = self.history_store.get
+        self.get_session_history = session_history
+        self._bots = {}
+        self._lock = threading.Lock()
+
+    def get_bot(self, bot_id):
+        if bot_id not in self.bot_configs:
+            raise KeyError(f"Unknown bot id: {bot_id}")
+        with self._lock:
+            bot = self._bots.get(bot_id)
+            if bot is None:
+                bot = self._bots[bot_id] = Bot(bot_id, self.bot_configs[bot_id], self)
+        bot.refresh()
+        return bot
+
+    def warm_up(self, bot_ids=None):
+        """Build (and sync) the given bots, or all of them, ahead of the first request."""
+        for bot_id in bot_ids or self.bot_configs:
+            self.get_bot(bot_id)
+
+    def cache_stats(self):
+        """Hit/miss counters of the query caches shared by all bots."""
+        query_cache = getattr(self.embeddings, "query_cache", None)
+        return {
+            "query_embeddings": query_cache.stats() if query_cache is not None else None,
+            "rewrite_cache": self.rewrite_cache.stats(),
+        }
+
+    def invoke(self, bot_id, question, session_id):
+        return self.get_bot(bot_id).conversational_chain.invoke(
+            {"input": question}, config={"configurable": {"session_id": session_id}}
+        )
+
+    def stream(self, bot_id, question, session_id, timings):
+        """Yield answer tokens; see rag.stream_answer for ``timings``."""
+        return stream_answer(
+            self.get_bot(bot_id).conversational_chain,
+            {"input": question},
+            {"configurable": {"session_id": session_id}},
+            timings,
+        )
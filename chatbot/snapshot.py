@@ -0,0 +1,211 @@
+import argparse
+import json
+import os
+import struct
+
+import numpy as np
+
+from ingestion import MANIFEST_VERSION, collection_version, file_sha256, load_manifest, save_manifest
+from retrievers import BM25_INDEX_NAME, BM25Index
+from vector_index import MmapVectorStore, normalize
+
+# File layout: magic, little-endian uint64 header length, JSON header, zero
+# padding to ALIGNMENT bytes, then count x dim normalized little-endian
+# float32 vectors
+SNAPSHOT_MAGIC = b"RAGSNAP2"
+SNAPSHOT_SUFFIX = ".ragsnap"
+ALIGNMENT = 64
+
+
+class SnapshotMismatch(ValueError):
+    """The snapshot was built from a different PDF, splitter or embedding model."""
+
+
+class Snapshot:
+    """A collection exported to one portable file.
+
+    The header holds the embedding model, the sha256 of the source PDF, the
+    splitter settings, page manifest and collection version, the chunk
+    ids, texts and metadata and the BM25 postings; the normalized vectors
+    follow as one aligned float32 block. Opening a snapshot reads the
+    header and memory-maps the block, so no vector is copied until it is
+    used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic = f.read(len(SNAPSHOT_MAGIC))
+            if magic != SNAPSHOT_MAGIC:
+                if magic.startswith(SNAPSHOT_MAGIC[:-1]):
+                    raise SnapshotMismatch("written in an older snapshot format; export it again")
+                raise ValueError(f"Not a collection snapshot: {path}")
+            (length,) = struct.unpack("<Q", f.read(8))
+            self.header = json.loads(f.read(length).decode("utf-8"))
+        self.vectors = np.memmap(
+            path, dtype="<f4", mode="r", offset=self.header["offset"],
+            shape=(self.header["count"], self.header["dim"]),
+        )
+
+    @property
+    def model(self):
+        return self.header["model"]
+
+    @property
+    def pdf_sha256(self):
+        return self.header["pdf_sha256"]
+
+    @property
+    def splitter(self):
+        return self.header["splitter"]
+
+    @property
+    def version(self):
+        return self.header["version"]
+
+    def check(self, pdf_path, model_name, splitter=None):
+        """Raise SnapshotMismatch unless the snapshot was built from ``pdf_path`` with this model and splitter."""
+        if self.model != model_name:
+            raise SnapshotMismatch(f"built with embedding model {self.model}, not {model_name}")
+        if splitter is not None and self.splitter != splitter:
+            raise SnapshotMismatch(f"built with splitter {self.splitter}, not {splitter}")
+        if file_sha256(pdf_path) != self.pdf_sha256:
+            raise SnapshotMismatch(f"built from a different version of {os.path.basename(pdf_path)}")
+
+    def manifest(self):
+        return {
+            "version": MANIFEST_VERSION,
+            "source": self.header["source"],
+            "pdf_sha256": self.pdf_sha256,
+            "splitter": self.splitter,
+            "pages": self.header["pages"],
+        }
+
+
+class SnapshotVectorStore(MmapVectorStore):
+    """MmapVectorStore searching the vector block of a snapshot file in place.
+
+    The snapshot must stay at its path while the store is in use; replacing
+    it with ``export_snapshot`` is safe, as that swaps in a new file.
+    """
+
+    def __init__(self, snapshot, embeddings):
+        self.directory = os.path.dirname(snapshot.path)
+        self.embeddings = embeddings
+        self.meta = {"dim": snapshot.header["dim"], "count": snapshot.header["count"], "version": snapshot.version}
+        self._set_documents(snapshot.header["ids"], snapshot.header["texts"], snapshot.header["metadatas"])
+        self.vectors = snapshot.vectors
+
+
+def export_snapshot(vectordb, persist_directory, path, model_name):
+    """Write the collection synced into ``persist_directory`` to a snapshot file at ``path``."""
+    manifest = load_manifest(persist_directory)
+    if manifest is None:
+        raise ValueError(f"No manifest in {persist_directory}; sync the collection first")
+    if isinstance(vectordb, MmapVectorStore):
+        ids, texts, metadatas, vectors = vectordb.ids, vectordb.texts, vectordb.metadatas, vectordb.vectors
+    else:
+        data = vectordb.get(include=["embeddings", "documents", "metadatas"])
+        ids, texts, metadatas = data["ids"], data["documents"], [m or {} for m in data["metadatas"]]
+        vectors = np.asarray(data["embeddings"], dtype=np.float32).reshape(len(ids), -1)
+    vectors = np.ascontiguousarray(normalize(vectors), dtype="<f4")
+    if os.path.exists(os.path.join(persist_directory, BM25_INDEX_NAME)):
+        bm25 = BM25Index.load(persist_directory)
+    else:
+        bm25 = BM25Index.build(ids, texts, metadatas)
+    if bm25.ids != list(ids):
+        bm25 = BM25Index.build(ids, texts, metadatas)
+
+    header = {
+        "model": model_name,
+        "source": manifest["source"],
+        "pdf_sha256": manifest["pdf_sha256"],
+        "splitter": manifest["splitter"],
+        "pages": manifest["pages"],
+        "version": collection_version(persist_directory, manifest),
+        "count": len(ids),
+        "dim": int(vectors.shape[1]) if len(ids) else 0,
+        "ids": ids,
+        "texts": texts,
+        "metadatas": metadatas,
+        "bm25_postings": bm25.to_dict()["postings"],
+    }
+    # The offset is part of the header, so grow it until the header fits in front of it
+    offset = 0
+    while True:
+        encoded = json.dumps({**header, "offset": offset}).encode("utf-8")
+        start = len(SNAPSHOT_MAGIC) + 8 + len(encoded)
+        if start <= offset:
+            break
+        offset = -(-start // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (offset - start))
+        f.write(vectors.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def import_snapshot(path, persist_directory, pdf_path, model_name, splitter=None):
+    """Check a snapshot against ``pdf_path`` and make ``persist_directory`` serve it.
+
+    Returns the Snapshot and "current" when the store already matches it,
+    or "imported" after writing its manifest and BM25 index; raises
+    SnapshotMismatch when the snapshot does not match the PDF, model or
+    splitter. No vectors are copied: search goes through a
+    SnapshotVectorStore over the snapshot file. Chroma is left untouched,
+    so a later sync that needs Chroma embeds into it from scratch.
+    """
+    snapshot = Snapshot(path)
+    snapshot.check(pdf_path, model_name, splitter)
+
+    manifest = load_manifest(persist_directory)
+    if manifest is not None and manifest["pdf_sha256"] == snapshot.pdf_sha256 \
+            and manifest["splitter"] == snapshot.splitter \
+            and os.path.exists(os.path.join(persist_directory, BM25_INDEX_NAME)):
+        return snapshot, "current"
+
+    os.makedirs(persist_directory, exist_ok=True)
+    header = snapshot.header
+    BM25Index.write(persist_directory, {
+        "ids": header["ids"], "texts": header["texts"], "metadatas": header["metadatas"],
+        "postings": header["bm25_postings"],
+    })
+    # Written last: the manifest is what marks the store as up to date
+    save_manifest(persist_directory, snapshot.manifest())
+    return snapshot, "imported"
+
+
+if __name__ == "__main__":
+    from bots import BOT_CONFIGS
+    from embedding_cache import CachedEmbeddings
+    from ingestion import splitter_settings, sync_chroma_db
+    from langchain_huggingface import HuggingFaceEmbeddings
+    from service import CHUNK_SIZE, CHUNKER, EMBEDDING_MODEL, SNAPSHOT_DIR
+
+    parser = argparse.ArgumentParser(description="Export or import a portable snapshot of a bot's collection.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("bot", choices=sorted(BOT_CONFIGS))
+    parser.add_argument("--path", help=f"snapshot file (default: {SNAPSHOT_DIR}/<bot>{SNAPSHOT_SUFFIX})")
+    args = parser.parse_args()
+
+    config = BOT_CONFIGS[args.bot]
+    path = args.path or os.path.join(SNAPSHOT_DIR, args.bot + SNAPSHOT_SUFFIX)
+    if args.action == "export":
+        embeddings = CachedEmbeddings(HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), EMBEDDING_MODEL)
+        vectordb, _ = sync_chroma_db(
+            config["pdf_path"], config["chroma_db_path"], embeddings, chunk_size=CHUNK_SIZE, chunker=CHUNKER
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        export_snapshot(vectordb, config["chroma_db_path"], path, EMBEDDING_MODEL)
+        print(f"Snapshot written to {path}")
+    else:
+        _, status = import_snapshot(
+            path, config["chroma_db_path"], config["pdf_path"], EMBEDDING_MODEL,
+            splitter=splitter_settings(CHUNK_SIZE, chunker=CHUNKER),
+        )
+        print(f"{path}: {status}")
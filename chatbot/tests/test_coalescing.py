@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from coalescing import SingleFlight
+
+
+def gated(chunks, gate, calls, error=None):
+    """A produce() that yields its first chunk, waits for ``gate`` and then yields the rest."""
+
+    def produce():
+        calls.append(1)
+        yield chunks[0]
+        gate.wait(5)
+        yield from chunks[1:]
+        if error is not None:
+            raise error
+
+    return produce
+
+
+def test_concurrent_callers_share_one_run():
+    single_flight, gate, calls = SingleFlight(), threading.Event(), []
+    key = single_flight.key("What is the leave policy?")
+    leader = single_flight.stream(key, gated(["a", "b", "c"], gate, calls))
+    assert next(leader) == "a"
+    follower = single_flight.stream(single_flight.key("what is the leave policy"), gated(["x"], gate, calls))
+    gate.set()
+    assert list(leader) == ["b", "c"]
+    assert list(follower) == ["a", "b", "c"]
+    assert len(calls) == 1
+    assert single_flight.stats()["followers"] == 1
+
+
+def test_closed_leader_does_not_fail_followers():
+    single_flight, gate, calls = SingleFlight(), threading.Event(), []
+    key = single_flight.key("question")
+    leader = single_flight.stream(key, gated(["a", "b", "c"], gate, calls))
+    assert next(leader) == "a"
+    follower = single_flight.stream(key, gated(["x"], gate, calls))
+    leader.close()
+    gate.set()
+    assert list(follower) == ["a", "b", "c"]
+
+
+def test_errors_reach_every_caller():
+    single_flight, gate, calls = SingleFlight(), threading.Event(), []
+    key = single_flight.key("question")
+    leader = single_flight.stream(key, gated(["a"], gate, calls, error=ValueError("boom")))
+    assert next(leader) == "a"
+    follower = single_flight.stream(key, gated(["x"], gate, calls))
+    gate.set()
+    with pytest.raises(ValueError):
+        list(leader)
+    with pytest.raises(RuntimeError):
+        list(follower)
+    # A failed run is not reused by the next caller
+    assert list(single_flight.stream(key, lambda: iter(["again"]))) == ["again"]
+
+
+def test_shared_answer_is_traced_once():
+    from langchain_core.documents import Document
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+    from langchain_core.runnables import RunnableLambda
+
+    from rag import build_rag_chain
+    from tracing import Tracer
+
+    def prompt(system):
+        return ChatPromptTemplate.from_messages([("system", system), MessagesPlaceholder("chat_history"), ("human", "{input}")])
+
+    tracer = Tracer()
+    chain = build_rag_chain(
+        FakeListChatModel(responses=["The leave policy allows 24 days."], sleep=0.01),
+        RunnableLambda(lambda question: [Document(page_content="Employees get 24 days of leave.")]),
+        prompt("Rewrite the question."), prompt("Answer from {context}"),
+        tracer=tracer, single_flight=SingleFlight(),
+    )
+    inputs = {"input": "What is the leave policy?", "chat_history": []}
+    leader = chain.stream(inputs)
+    next(leader)
+    answers = []
+    follower = threading.Thread(target=lambda: answers.append("".join(c.get("answer", "") for c in chain.stream(inputs))))
+    follower.start()
+    leader.close()
+    follower.join(5)
+
+    assert answers == ["The leave policy allows 24 days."]
+    metrics = tracer.metrics()
+    assert metrics["questions"] == 2
+    assert metrics["stages"]["total"]["count"] == 2
+    assert metrics["stages"]["retrieve"]["count"] == 1
+    assert metrics["stages"]["shared_answer"]["count"] == 1
@@ -0,0 +1,47 @@
+import threading
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from history import ChatHistoryStore
+
+
+def test_history_survives_reload(tmp_path):
+    llm = FakeListChatModel(responses=["SUMMARY"])
+    store = ChatHistoryStore(str(tmp_path), llm, shards=2, max_turns=2)
+    history = store.get("hr:a")
+    for i in range(5):
+        history.add_messages([HumanMessage(f"q{i}"), AIMessage(f"a{i}")])
+    store.close()
+
+    reloaded = ChatHistoryStore(str(tmp_path), llm, shards=2, max_turns=2).get("hr:a")
+    assert [m.content for m in reloaded.messages] == [m.content for m in history.messages]
+    assert reloaded.summary == "SUMMARY"
+
+
+def test_concurrent_appends_to_one_session(tmp_path):
+    # A slow summarizer widens the window in which appends could interleave
+    llm = FakeListChatModel(responses=["SUMMARY"], sleep=0.001)
+    store = ChatHistoryStore(str(tmp_path), llm, shards=2, max_turns=2)
+
+    errors = []
+
+    def chat(worker):
+        try:
+            for i in range(10):
+                store.get("hr:a").add_messages([HumanMessage(f"q{worker}.{i}"), AIMessage(f"a{worker}.{i}")])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=chat, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    history = store.get("hr:a")
+    assert len(history.recent_ids) == len(history.recent)
+    store.close()
+    reloaded = ChatHistoryStore(str(tmp_path), llm, shards=2, max_turns=2).get("hr:a")
+    assert [m.content for m in reloaded.messages] == [m.content for m in history.messages]
@@ -0,0 +1,30 @@
+from intent_client import CompletionClient, StubCompletionServer
+
+
+def prompt(query):
+    return f"Classify this.\nUser Query: {query}\nIntent:"
+
+
+def test_complete_retries_after_failures():
+    with StubCompletionServer(fail_first=2) as stub:
+        client = CompletionClient(stub.url, "key", backoff=0.01)
+        assert client.complete(prompt("Please cancel my flight")) == "Cancel"
+        assert stub.requests == 3
+        client.close()
+
+
+def test_complete_gives_up_after_max_retries():
+    with StubCompletionServer(fail_first=10) as stub:
+        client = CompletionClient(stub.url, "key", max_retries=1, backoff=0.01)
+        assert client.complete(prompt("Book a room")) == "Error: API request failed with status code 503"
+        assert stub.requests == 2
+        client.close()
+
+
+def test_complete_many_keeps_input_order():
+    queries = ["Book a room", "Cancel my order", "Great stay", "Reserve a table"] * 5
+    with StubCompletionServer(fail_first=3, latency=0.01) as stub:
+        client = CompletionClient(stub.url, "key", backoff=0.01)
+        replies = client.complete_many([prompt(query) for query in queries], max_workers=8)
+        client.close()
+    assert replies == ["Booking", "Cancel", "Feedback", "Booking"] * 5
@@ -0,0 +1,87 @@
+import pytest
+
+from nu_tables import AllowanceTable
+
+# The Grid B page of tables.pdf as pypdf extracts it
+GRID_B_PAGE = (
+    "accommodation limits, Daily allowance for local travel, food etc , and applicable mode of travel are \n"
+    "detailed below. \n  \nGrid B: \n Designation/ Grade City  Accommodation (Rs. Per night) "
+    "Daily Allowance (Food, Conveyance etc) (Rs.) Mode Of Travel \n"
+    "Board Members / MD /AD / \nCluster head / Unit Heads / \nCXOs \n"
+    "A 7000 4000 Air / 1st class \nA.C.TRAIN  B 4500 3000 C 3000 2000 \n"
+    "Managers \nA 4000 3000 Air  / II TIER \nA.C.TRAIN  B 3000 2000 C 2000 1000 \n"
+    "Asst. Managers/ In -Charge \npersonnel / Dietitians/ Sr. \nExecutives \n"
+    "A 3000 2000 II / III TIER \nA.C.TRAIN  B 2000 1000 C 1000 500 \n"
+    "Executives \nA 2000 500 III TIER \nA.C.TRAIN  B 1000 500 C 1000 500 \n"
+    "Trainees \nA 1000 500 \nIII TIER \nA.C.TRAIN  B 1000 500 C 1000 500 \n"
+    "Note: The city classification represents: \nClass City \n"
+    "A Mumbai, Chennai, Kolkata and New Delhi \n"
+    "B Hyderabad, Pune, Chandigarh, Ahmedabad, Kochi, Trivandrum \n"
+    "C All other cities, excluding the A and B cities \n \nGuidelines: \n"
+)
+
+MANAGERS = "Managers"
+SENIOR = "Asst. Managers / In-Charge personnel / Dietitians / Sr. Executives"
+
+
+@pytest.fixture(scope="module")
+def table():
+    return AllowanceTable.from_text(GRID_B_PAGE)
+
+
+def test_from_text_parses_rows(table):
+    assert len(table.rows) == 15
+    assert table.rows[(MANAGERS, "A")] == {
+        "accommodation": 4000, "daily_allowance": 3000, "mode_of_travel": "Air / II TIER A.C.TRAIN",
+    }
+    assert table.rows[("Board Members / MD / AD / Cluster head / Unit Heads / CXOs", "B")]["accommodation"] == 4500
+    assert table.rows[("Trainees", "C")]["daily_allowance"] == 500
+
+
+def test_from_text_parses_aliases_and_cities(table):
+    assert table.aliases["senior executive"] == SENIOR
+    assert table.aliases["dietician"] == SENIOR
+    assert table.aliases["cxo"] == "Board Members / MD / AD / Cluster head / Unit Heads / CXOs"
+    assert table.city_classes == {
+        "mumbai": "A", "chennai": "A", "kolkata": "A", "new delhi": "A", "hyderabad": "B", "pune": "B",
+        "chandigarh": "B", "ahmedabad": "B", "kochi": "B", "trivandrum": "B",
+    }
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is the accommodation allowance for a Manager in Mumbai?", ("Mumbai", "A", MANAGERS)),
+    ("How much DA does a manager get in Pune?", ("Pune", "B", MANAGERS)),
+    ("Which mode of travel for Sr. Executives visiting Kochi?", ("Kochi", "B", SENIOR)),
+    ("What is the hotel limit per night for managers in a class C city?", ("Class C city", "C", MANAGERS)),
+    # Other names of listed cities
+    ("What is the DA for a manager in Delhi?", ("New Delhi", "A", MANAGERS)),
+    ("Accommodation allowance for a dietician in Bombay", ("Mumbai", "A", SENIOR)),
+])
+def test_resolve_direct_lookups(table, question, expected):
+    city, city_class, designation, row = table.resolve(question)
+    assert (city, city_class, designation) == expected
+    assert row == table.rows[(designation, city_class)]
+
+
+@pytest.mark.parametrize("question", [
+    # Not about allowances
+    "How many days of leave encashment are allowed for managers?",
+    "Is the probation period the same for executives in Mumbai?",
+    # Unlisted cities, including a longer place name around a listed one
+    "What is the accommodation allowance for a manager in Nagpur?",
+    "Accommodation allowance for a Manager in Navi Mumbai",
+    # Questions the table row does not answer
+    "Is the DA for an executive in Chennai taxable?",
+    "What accommodation do executives in Kolkata get if they are not eligible for DA?",
+    "What is the DA for managers in Mumbai and Chennai?",
+    # Missing designation
+    "What is the DA in Mumbai?",
+])
+def test_resolve_leaves_other_questions_to_rag(table, question):
+    assert table.resolve(question) is None
+    assert table.answer(question) is None
+
+
+def test_answer_formats_the_row(table):
+    answer = table.answer("What is the daily allowance for a trainee in Chandigarh?")
+    assert "| Chandigarh | B | Trainees | 1000 | 500 | III TIER A.C.TRAIN |" in answer
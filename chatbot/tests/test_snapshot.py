@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from ingestion import MANIFEST_VERSION, collection_version, file_sha256, load_manifest, save_manifest, splitter_settings
+from retrievers import BM25Index
+from snapshot import Snapshot, SnapshotMismatch, SnapshotVectorStore, export_snapshot, import_snapshot
+from vector_index import MmapVectorStore, normalize
+
+MODEL = "test-model"
+TEXTS = ["annual leave policy", "travel allowance for class A cities", "probation period", "medical insurance"]
+
+
+@pytest.fixture
+def exported(tmp_path):
+    pdf = tmp_path / "handbook.pdf"
+    pdf.write_bytes(b"%PDF handbook")
+    store = str(tmp_path / "store")
+    splitter = splitter_settings(1500, chunker="layout")
+    save_manifest(store, {
+        "version": MANIFEST_VERSION, "source": str(pdf), "pdf_sha256": file_sha256(pdf),
+        "splitter": splitter, "pages": {},
+    })
+    ids = [f"chunk-{i}" for i in range(len(TEXTS))]
+    vectors = np.random.default_rng(0).normal(size=(len(TEXTS), 8)).astype(np.float32)
+    MmapVectorStore.build(
+        MmapVectorStore.path(store), ids, TEXTS, [{"page": i} for i in range(len(TEXTS))], vectors,
+        version=collection_version(store),
+    )
+    BM25Index.build(ids, TEXTS, [{}] * len(TEXTS)).save(store)
+    source = MmapVectorStore.open(store, None, collection_version(store))
+    path = export_snapshot(source, store, str(tmp_path / "handbook.ragsnap"), MODEL)
+    return pdf, store, splitter, source, path
+
+
+def test_import_serves_the_snapshot_in_place(tmp_path, exported):
+    pdf, store, splitter, source, path = exported
+    target = str(tmp_path / "imported")
+    snapshot, status = import_snapshot(path, target, pdf, MODEL, splitter=splitter)
+    assert status == "imported"
+    assert load_manifest(target) == load_manifest(store)
+    assert snapshot.version == collection_version(target)
+    bm25 = BM25Index.load(target)
+    assert bm25.ids == source.ids
+    assert bm25.search("travel allowance", 1)[0][0] == 1
+
+    restored = SnapshotVectorStore(snapshot, None)
+    assert isinstance(restored.vectors, np.memmap)
+    query = normalize(np.random.default_rng(1).normal(size=8))
+    assert restored.search_by_vector(query, 3) == pytest.approx(source.search_by_vector(query, 3))
+    assert restored.document(2).page_content == TEXTS[2]
+
+    assert import_snapshot(path, target, pdf, MODEL, splitter=splitter)[1] == "current"
+
+
+def test_mismatched_snapshot_is_rejected(tmp_path, exported):
+    pdf, _, splitter, _, path = exported
+    target = str(tmp_path / "imported")
+    with pytest.raises(SnapshotMismatch):
+        import_snapshot(path, target, pdf, "other-model", splitter=splitter)
+    with pytest.raises(SnapshotMismatch):
+        import_snapshot(path, target, pdf, MODEL, splitter=splitter_settings(1000))
+    pdf.write_bytes(b"%PDF revised handbook")
+    with pytest.raises(SnapshotMismatch):
+        Snapshot(path).check(pdf, MODEL)
+    assert load_manifest(target) is None
@@ -0,0 +1,140 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class Trace:
+    """Timings and sizes recorded for one question.
+
+    A ``shared`` trace covers one answer computation shared by several
+    questions (see coalescing.SingleFlight); its overall time is recorded
+    as the "shared_answer" stage instead of "total", and it does not count
+    as a question.
+    """
+
+    def __init__(self, tracer, shared=False):
+        self.tracer = tracer
+        self.shared = shared
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.fields = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def mark(self, name):
+        """Record the time since the trace started, e.g. for the first answer token."""
+        self.stages.setdefault(name, time.perf_counter() - self.started)
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    @property
+    def total_stage(self):
+        return "shared_answer" if self.shared else "total"
+
+    def finish(self):
+        self.stages[self.total_stage] = time.perf_counter() - self.started
+        self.tracer.record(self)
+
+
+class Tracer:
+    """Per-stage latency tracing for the RAG chain.
+
+    Keeps the last ``window`` durations of each stage. A background thread
+    rewrites ``metrics_path`` with their p50/p95/p99 at most every
+    ``flush_interval`` seconds, and only when something was recorded, so
+    questions never wait on the file. Traces slower than ``slow_threshold``
+    seconds are appended as JSON lines to ``slow_trace_path`` when it is
+    set.
+    """
+
+    def __init__(self, metrics_path=None, slow_trace_path=None, slow_threshold=5.0, window=1000, flush_interval=1.0):
+        self.metrics_path = metrics_path
+        self.slow_trace_path = slow_trace_path
+        self.slow_threshold = slow_threshold
+        self.window = window
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._durations = defaultdict(lambda: deque(maxlen=window))
+        self._fields = defaultdict(lambda: deque(maxlen=window))
+        self._dirty = False
+        self._flusher = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._slow_lock = threading.Lock()
+        if metrics_path:
+            atexit.register(self.flush)
+
+    def start(self, shared=False):
+        return Trace(self, shared=shared)
+
+    def record(self, trace):
+        with self._lock:
+            if not trace.shared:
+                self.count += 1
+            for name, seconds in trace.stages.items():
+                self._durations[name].append(seconds)
+            for name, value in trace.fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._fields[name].append(value)
+            self._dirty = True
+            if self.metrics_path and self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_periodically, name="metrics-flusher", daemon=True)
+                self._flusher.start()
+
+        if self.slow_trace_path and trace.stages[trace.total_stage] >= self.slow_threshold:
+            line = json.dumps({
+                "time": time.time(), "shared": trace.shared, "stages": trace.stages, **trace.fields,
+            }, default=str) + "\n"
+            with self._slow_lock:
+                os.makedirs(os.path.dirname(self.slow_trace_path) or ".", exist_ok=True)
+                with open(self.slow_trace_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Rewrite ``metrics_path`` if anything was recorded since it was last written."""
+        with self._lock:
+            if not self.metrics_path or not self._dirty:
+                return
+            self._dirty = False
+            metrics = self._metrics()
+
+        # The periodic flush and an explicit one share the tmp file, so writes take turns
+        with self._write_lock:
+            os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+            tmp_path = self.metrics_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(metrics, f, indent=2)
+            os.replace(tmp_path, self.metrics_path)
+
+    def _metrics(self):
+        def summary(values):
+            p50, p95, p99 = np.percentile(np.asarray(values), [50, 95, 99])
+            return {"count": len(values), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+        return {
+            "questions": self.count,
+            "stages": {name: summary(values) for name, values in self._durations.items() if values},
+            "fields": {name: summary(values) for name, values in self._fields.items() if values},
+        }
+
+    def metrics(self):
+        with self._lock:
+            return self._metrics()
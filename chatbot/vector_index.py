@@ -0,0 +1,288 @@
+import json
+import os
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+CODE_DTYPES = {"int8": np.int8, "float16": np.float16}
+# Largest code value per dtype; vectors are scaled so their largest component maps to it
+CODE_MAX = {"int8": 127.0, "float16": 1.0}
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def quantize(vectors, dtype="int8"):
+    """Return (codes, scales) with ``vectors[i] ~= codes[i] * scales[i]``."""
+    scales = np.abs(vectors).max(axis=1) / CODE_MAX[dtype]
+    scales[scales == 0] = 1.0
+    codes = vectors / scales[:, None]
+    if dtype == "int8":
+        codes = np.rint(codes)
+    return codes.astype(CODE_DTYPES[dtype]), scales.astype(np.float32)
+
+
+def mmr(relevance, candidates, k=4, lambda_mult=0.5):
+    """Maximal marginal relevance over normalized candidate vectors.
+
+    Returns the positions (into ``candidates``) of up to ``k`` picks, in
+    pick order. Each step scores all remaining candidates at once as
+    ``lambda_mult * relevance - (1 - lambda_mult) * max cosine similarity
+    to the picks so far``; the candidate similarities are one matrix
+    product, so no embeddings are computed.
+    """
+    relevance = np.asarray(relevance, dtype=np.float32)
+    if not len(relevance):
+        return []
+    similarity = candidates @ candidates.T
+    picked = [int(np.argmax(relevance))]
+    redundancy = similarity[picked[0]].copy()
+    for _ in range(min(k, len(relevance)) - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return picked
+
+
+def stored_vectors(vectordb, ids):
+    """Normalized stored embeddings of ``ids`` (rows of zeros for unknown ids), from Chroma or a vector_index store."""
+    if isinstance(vectordb, MmapVectorStore):
+        return vectordb.vectors_for(ids)
+    data = vectordb.get(ids=list(ids), include=["embeddings"])
+    rows = dict(zip(data["ids"], data["embeddings"]))
+    dim = len(data["embeddings"][0]) if len(data["ids"]) else 1
+    return normalize([rows[chunk_id] if chunk_id in rows else np.zeros(dim) for chunk_id in ids])
+
+
+class MmapVectorStore:
+    """Exact cosine search over a memory-mapped matrix of normalized embeddings.
+
+    The store is a directory next to the Chroma files: a ``vectors`` .npy
+    file (one float32 row per chunk, opened with ``mmap_mode="r"``) and a
+    ``docs`` sidecar with ids, texts and metadata, both named in
+    ``meta.json``. Opening it maps the
+    file and reads the sidecar, which takes milliseconds; a query is one
+    matrix-vector product plus a partial sort. Meant for handbook-sized
+    collections where that beats starting a Chroma client. The methods
+    mirror the Chroma ones HybridRetriever and the chains call.
+    """
+
+    SUBDIR = "exact"
+
+    def __init__(self, directory, embeddings):
+        self.directory = directory
+        self.embeddings = embeddings
+        self.meta = self.read_meta(directory)
+        with open(self.file("docs"), "r", encoding="utf-8") as f:
+            docs = json.load(f)
+        self._set_documents(docs["ids"], docs["texts"], docs["metadatas"])
+        self.vectors = np.load(self.file("vectors"), mmap_mode="r")
+
+    def _set_documents(self, ids, texts, metadatas):
+        self.ids, self.texts, self.metadatas = ids, texts, metadatas
+        self.positions = {chunk_id: position for position, chunk_id in enumerate(ids)}
+
+    def file(self, name):
+        return os.path.join(self.directory, self.meta["files"][name])
+
+    @classmethod
+    def path(cls, persist_directory):
+        return os.path.join(persist_directory, cls.SUBDIR)
+
+    @staticmethod
+    def read_meta(directory):
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @classmethod
+    def _write(cls, directory, vectors, generation, options):
+        """Write the array files of one generation; returns their names by role."""
+        name = f"vectors-{generation}.npy"
+        np.save(os.path.join(directory, name), vectors)
+        return {"vectors": name}
+
+    @classmethod
+    def build(cls, directory, ids, texts, metadatas, vectors, version=None, **options):
+        """Write the store files for ``vectors`` (one row per id) to ``directory``.
+
+        Every build writes a new generation of files and then swaps in a
+        ``meta.json`` naming them, so stores that still have the previous
+        files mapped keep reading them unchanged. Files older than the
+        previous generation are deleted.
+        """
+        vectors = normalize(vectors)
+        os.makedirs(directory, exist_ok=True)
+        previous = cls.read_meta(directory)
+        generation = uuid.uuid4().hex[:12]
+        files = cls._write(directory, vectors, generation, options)
+        files["docs"] = f"docs-{generation}.json"
+        with open(os.path.join(directory, files["docs"]), "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f)
+
+        meta_path = os.path.join(directory, "meta.json")
+        tmp_path = f"{meta_path}.{generation}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": int(vectors.shape[1]), "count": len(ids), "version": version, "files": files, **options,
+            }, f)
+        os.replace(tmp_path, meta_path)
+
+        keep = {"meta.json", *files.values(), *((previous or {}).get("files") or {}).values()}
+        for name in os.listdir(directory):
+            if name not in keep and not name.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:  # Windows: still mapped by a live store
+                    pass
+
+    @classmethod
+    def open(cls, persist_directory, embeddings, version, **options):
+        """Open the store if it was built for ``version`` with ``options``, else return None."""
+        directory = cls.path(persist_directory)
+        meta = cls.read_meta(directory)
+        if version is None or meta is None or "files" not in meta:
+            return None
+        if meta["version"] != version or any(meta.get(key) != value for key, value in options.items()):
+            return None
+        return cls(directory, embeddings, **options)
+
+    @classmethod
+    def from_vectordb(cls, vectordb, embeddings, persist_directory, version=None, **options):
+        """Open the copy of ``vectordb`` for ``version``, (re)building it from Chroma when stale."""
+        store = cls.open(persist_directory, embeddings, version, **options)
+        if store is None:
+            data = vectordb.get(include=["embeddings", "documents", "metadatas"])
+            cls.build(
+                cls.path(persist_directory), data["ids"], data["documents"], [m or {} for m in data["metadatas"]],
+                np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["ids"]), -1),
+                version=version, **options,
+            )
+            store = cls(cls.path(persist_directory), embeddings, **options)
+        return store
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self):
+        """Bytes searched per query (the mapped pages stay in the OS page cache)."""
+        return self.vectors.nbytes
+
+    def search_by_vector(self, embedding, k=4):
+        """Return up to ``k`` (position, cosine score) pairs, best first."""
+        if not len(self.ids):
+            return []
+        scores = self.vectors @ normalize(embedding)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(position), float(scores[position])) for position in top]
+
+    def vectors_for(self, ids):
+        """Stored vectors of ``ids``; unknown ids get a row of zeros."""
+        rows = np.zeros((len(ids), self.vectors.shape[1]), dtype=np.float32)
+        found = [(i, self.positions[chunk_id]) for i, chunk_id in enumerate(ids) if chunk_id in self.positions]
+        if found:
+            rows[[i for i, _ in found]] = self.vectors[[position for _, position in found]]
+        return rows
+
+    def document(self, position):
+        return Document(id=self.ids[position], page_content=self.texts[position], metadata=self.metadatas[position])
+
+    def similarity_search_with_score(self, query, k=4):
+        return [
+            (self.document(position), score)
+            for position, score in self.search_by_vector(self.embeddings.embed_query(query), k)
+        ]
+
+    def similarity_search(self, query, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [self.document(position) for position, _ in self.search_by_vector(embedding, k)]
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5):
+        """Diversified top-``k`` from the ``fetch_k`` nearest chunks, scored on their stored vectors."""
+        query = normalize(self.embeddings.embed_query(query))
+        found = self.search_by_vector(query, fetch_k)
+        positions = [position for position, _ in found]
+        picks = mmr([score for _, score in found], np.asarray(self.vectors[positions]), k=k, lambda_mult=lambda_mult)
+        return [self.document(positions[i]) for i in picks]
+
+
+class QuantizedVectorStore(MmapVectorStore):
+    """Compact variant of MmapVectorStore for collections too large to scan in float32.
+
+    Embeddings are kept in memory only as int8 or float16 codes with one
+    float32 scale per vector (about a quarter or half of the float32 size,
+    and no HNSW graph). A query scores every code in blocks, takes the best
+    ``k * rescore`` candidates and re-scores them against the
+    full-precision vectors, which stay on disk in the memory-mapped file
+    and are paged in only for those rows.
+    """
+
+    SUBDIR = "compact"
+    BLOCK_ROWS = 8192
+
+    def __init__(self, directory, embeddings, dtype="int8", rescore=4):
+        super().__init__(directory, embeddings)
+        self.rescore = rescore
+        self.codes = np.load(self.file("codes"))
+        self.scales = np.load(self.file("scales"))
+
+    @classmethod
+    def _write(cls, directory, vectors, generation, options):
+        dtype = options.get("dtype", "int8")
+        if dtype not in CODE_DTYPES:
+            raise ValueError(f"Unknown code dtype: {dtype}")
+        codes, scales = quantize(vectors, dtype)
+        files = {"codes": f"codes-{generation}.npy", "scales": f"scales-{generation}.npy"}
+        np.save(os.path.join(directory, files["codes"]), codes)
+        np.save(os.path.join(directory, files["scales"]), scales)
+        return {**files, **super()._write(directory, vectors, generation, options)}
+
+    @classmethod
+    def open(cls, persist_directory, embeddings, version, dtype="int8", rescore=4):
+        store = super().open(persist_directory, embeddings, version, dtype=dtype)
+        if store is not None:
+            store.rescore = rescore
+        return store
+
+    @classmethod
+    def from_vectordb(cls, vectordb, embeddings, persist_directory, version=None, dtype="int8", rescore=4):
+        store = super().from_vectordb(vectordb, embeddings, persist_directory, version=version, dtype=dtype)
+        store.rescore = rescore
+        return store
+
+    def nbytes(self):
+        """Bytes held in memory for search (codes and scales; full vectors stay on disk)."""
+        return self.codes.nbytes + self.scales.nbytes
+
+    def approximate_scores(self, query):
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), self.BLOCK_ROWS):
+            block = self.codes[start:start + self.BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores * self.scales
+
+    def search_by_vector(self, embedding, k=4):
+        if not len(self.ids):
+            return []
+        query = normalize(embedding)
+        k = min(k, len(self.ids))
+        candidates = min(len(self.ids), max(k, k * self.rescore))
+        scores = self.approximate_scores(query)
+        top = np.argpartition(-scores, candidates - 1)[:candidates] if candidates < len(scores) else np.arange(len(scores))
+        # Sorted rows read the memory-mapped file sequentially
+        top = np.sort(top)
+        exact = np.asarray(self.vectors[top]) @ query
+        order = np.argsort(-exact, kind="stable")[:k]
+        return [(int(top[i]), float(exact[i])) for i in order]